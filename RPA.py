@@ -1,20 +1,40 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
-import subprocess
-import threading
+import queue
 import os
+import sys
 import shutil
+from agendador import Agendador, EntradaRepetida, EXECUTANDO, CONCLUIDA, ESTADOS_FINAIS
 
 # --- Configuração das Pastas ---
 # (Certifique-se que estas pastas existem)
 PASTA_DE_ENTRADA = "menus_para_processar"
 # --------------------------------
 
+# --- Configuração da Fila de Tarefas ---
+# Ficheiro onde a fila é guardada (sobrevive ao fechar a interface)
+ARQUIVO_FILA = "fila_de_tarefas.json"
+# Pasta com as cópias das planilhas de cada cadastro e os pedidos de cancelamento
+PASTA_FILA = "fila_rpa"
+# Quantas tarefas de cada canal podem correr ao mesmo tempo.
+# A IA e o navegador não partilham entradas, por isso correm em paralelo.
+LIMITES_POR_CANAL = {"ia": 1, "navegador": 1}
+# Planilha unificada que o cadastro usa (a mesma do .env)
+NOME_ARQUIVO_EXCEL_PADRAO = "planilha_cardapio_RPA.xlsx"
+# ---------------------------------------
+
+# --- Configuração do Log ---
+# Número máximo de linhas mantidas na caixa de log (as mais antigas são apagadas)
+MAX_LINHAS_LOG = 2000
+# De quanto em quanto tempo (ms) a interface esvazia a fila de mensagens
+INTERVALO_ATUALIZACAO_MS = 100
+# ---------------------------
+
 class InterfaceApp:
     def __init__(self, root):
         self.root = root
         root.title("Assistente de Automação de Cardápios")
-        root.geometry("700x550")
+        root.geometry("800x650")
 
         # --- Frame Principal ---
         main_frame = ttk.Frame(root, padding="10")
@@ -24,18 +44,56 @@ class InterfaceApp:
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=5)
 
-        # Botão 1: Adicionar Imagens
+        # Botão 1: Adicionar Imagens (sempre disponível, mesmo com tarefas a correr)
         self.btn_add = ttk.Button(button_frame, text="1. Adicionar Imagens...", command=self.adicionar_imagens)
         self.btn_add.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
 
-        # Botão 2: Processar Cardápios (Robô 1 e 2)
-        self.btn_process = ttk.Button(button_frame, text="2. Processar Cardápios (IA)", command=lambda: self.run_script("processar_cardapios.py"))
+        # Botão 2: Processar Cardápios (Robô 1 e 2) -> entra na fila
+        self.btn_process = ttk.Button(button_frame, text="2. Processar Cardápios (IA)", command=self.enfileirar_processamento)
         self.btn_process.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
 
-        # Botão 3: Cadastrar Produtos (Robô 3)
-        self.btn_upload = ttk.Button(button_frame, text="3. Cadastrar Produtos (RPA)", command=lambda: self.run_script("cadastrar_produtos_otimizado.py"))
+        # Botão 3: Cadastrar Produtos (Robô 3) -> entra na fila
+        self.btn_upload = ttk.Button(button_frame, text="3. Cadastrar Produtos (RPA)", command=self.enfileirar_cadastro)
         self.btn_upload.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        
+
+        # --- Fila de Tarefas ---
+        fila_label = ttk.Label(main_frame, text="Fila de Tarefas:")
+        fila_label.pack(anchor=tk.W)
+
+        colunas = ("id", "tarefa", "estado", "progresso", "eta")
+        self.tree = ttk.Treeview(main_frame, columns=colunas, show="headings", height=6, selectmode="browse")
+        for coluna, titulo, largura in (
+            ("id", "#", 40),
+            ("tarefa", "Tarefa", 220),
+            ("estado", "Estado", 110),
+            ("progresso", "Progresso", 250),
+            ("eta", "Tempo restante", 110),
+        ):
+            self.tree.heading(coluna, text=titulo)
+            self.tree.column(coluna, width=largura, anchor=tk.W)
+        self.tree.pack(fill=tk.X, pady=5)
+        self.tree.bind("<<TreeviewSelect>>", lambda event: self._atualizar_barra())
+
+        fila_botoes = ttk.Frame(main_frame)
+        fila_botoes.pack(fill=tk.X)
+
+        # Cancela a tarefa selecionada (na fila: sai da fila; a correr: para no fim do item atual)
+        self.btn_cancel = ttk.Button(fila_botoes, text="Cancelar Tarefa", command=self.cancelar)
+        self.btn_cancel.pack(side=tk.LEFT, padx=5)
+
+        self.btn_clear = ttk.Button(fila_botoes, text="Limpar Terminadas", command=self.limpar_terminadas)
+        self.btn_clear.pack(side=tk.LEFT, padx=5)
+
+        # --- Barra de Progresso (da tarefa selecionada, ou da que está a correr) ---
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.pack(fill=tk.X, pady=5)
+
+        self.progress_bar = ttk.Progressbar(progress_frame, orient=tk.HORIZONTAL, mode='determinate')
+        self.progress_bar.pack(fill=tk.X)
+
+        self.progress_label = ttk.Label(progress_frame, text="Nenhum robô em execução.")
+        self.progress_label.pack(anchor=tk.W)
+
         # Separador
         ttk.Separator(main_frame, orient='horizontal').pack(fill=tk.X, pady=10)
 
@@ -43,30 +101,44 @@ class InterfaceApp:
         log_label = ttk.Label(main_frame, text="Log de Atividade:")
         log_label.pack(anchor=tk.W)
 
-        self.log_area = scrolledtext.ScrolledText(main_frame, wrap=tk.WORD, height=25, state=tk.DISABLED)
+        self.log_area = scrolledtext.ScrolledText(main_frame, wrap=tk.WORD, height=18, state=tk.DISABLED)
         self.log_area.pack(fill=tk.BOTH, expand=True, pady=5)
-        
+
         # Tag para logs de sucesso
         self.log_area.tag_config('success', foreground='green')
         # Tag para logs de erro
         self.log_area.tag_config('error', foreground='red', font=('Helvetica', '9', 'bold'))
         # Tag para cabeçalhos
         self.log_area.tag_config('header', foreground='blue', font=('Helvetica', '10', 'bold'))
-        
+
         # Garante que as pastas existem ao iniciar
         os.makedirs(PASTA_DE_ENTRADA, exist_ok=True)
 
+        # Fila de mensagens vindas dos 'threads' das tarefas.
+        # A interface esvazia-a em lotes, em vez de um root.after por linha.
+        self.fila_mensagens = queue.Queue()
+
+        # Agendador: corre as tarefas e guarda a fila em disco
+        # Os cadastros que ficaram na fila não são retomados sozinhos (usariam a planilha de agora)
+        self.agendador = Agendador(ARQUIVO_FILA, PASTA_FILA, LIMITES_POR_CANAL, self._ao_evento,
+                                   canais_sem_retomar=("navegador",))
+        self.agendador.carregar()
+        self._atualizar_tabela()
+        self.agendador.despachar() # Retoma as tarefas que ficaram na fila
+
+        self.root.after(INTERVALO_ATUALIZACAO_MS, self._drenar_fila)
+
     def adicionar_imagens(self):
         """Abre uma janela para o usuário selecionar as imagens."""
         filetypes = [("Ficheiros de Imagem", "*.jpg *.jpeg *.png"), ("Todos os ficheiros", "*.*")]
         files = filedialog.askopenfilenames(title="Selecione as imagens dos cardápios", filetypes=filetypes)
-        
+
         if not files:
             self.log("Nenhuma imagem selecionada.", "error")
             return
-            
+
         self.log(f"Copiando {len(files)} imagens para a pasta '{PASTA_DE_ENTRADA}'...", "header")
-        
+
         count = 0
         for f_path in files:
             try:
@@ -77,88 +149,165 @@ class InterfaceApp:
                 count += 1
             except Exception as e:
                 self.log(f"  Erro ao copiar {filename}: {e}", "error")
-                
+
         self.log(f"\n{count} imagens copiadas com sucesso.", "success")
 
-    def run_script(self, script_name):
-        """Inicia a execução de um script num 'thread' separado para não bloquear a interface."""
-        
-        # Desativa os botões para evitar cliques duplos
-        self.btn_add.config(state=tk.DISABLED)
-        self.btn_process.config(state=tk.DISABLED)
-        self.btn_upload.config(state=tk.DISABLED)
-        
-        self.log(f"--- Iniciando script: {script_name} ---", "header")
-        
-        # Cria e inicia o 'thread'
-        thread = threading.Thread(target=self.execute_subprocess, args=(script_name,), daemon=True)
-        thread.start()
-
-    def execute_subprocess(self, script_name):
-        """O processo que corre "por trás dos panos"."""
-        
-        # Este é o comando que você digitaria no terminal
-        command = ["py", script_name]
-        
+    def enfileirar_processamento(self):
+        """Põe o processamento das imagens (IA) na fila."""
+        tarefa = self.agendador.adicionar("Processar Cardápios (IA)", "processar_cardapios.py", "ia")
+        self.log(f"--- Tarefa #{tarefa['id']} na fila: {tarefa['nome']} ---", "header")
+
+    def enfileirar_cadastro(self):
+        """
+        Põe o cadastro na fila. O robô recebe uma cópia da planilha unificada, para
+        que uma nova extração não a altere a meio. Se houver uma extração na fila,
+        o cadastro espera por ela e copia a planilha que ela produzir; senão, a
+        planilha é copiada já. Uma planilha já cadastrada não é cadastrada de novo.
+        """
+        arquivo_excel = self._arquivo_excel()
         try:
-            # Inicia o processo
-            # stdout=subprocess.PIPE: Captura a saída padrão (os 'print')
-            # stderr=subprocess.STDOUT: Captura os erros e os envia para o mesmo sítio que a saída padrão
-            # text=True: Retorna a saída como texto (string)
-            # encoding='utf-8': Garante a leitura correta de acentos
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                creationflags=subprocess.CREATE_NO_WINDOW # (Apenas Windows) Esconde a janela do terminal
+            tarefa = self.agendador.adicionar(
+                "Cadastrar Produtos (RPA)", "cadastrar_produtos_otimizado.py", "navegador",
+                arquivo_entrada=arquivo_excel, variavel_entrada="ARQUIVO_EXCEL", apos_canal="ia"
             )
+        except FileNotFoundError:
+            self.log(f"Nenhuma planilha '{arquivo_excel}' para cadastrar. Processe os cardápios primeiro.", "error")
+            return
+        except EntradaRepetida as e:
+            self.log(f"{e} Processe novos cardápios antes de cadastrar.", "error")
+            return
+        self.log(f"--- Tarefa #{tarefa['id']} na fila: {tarefa['nome']} ---", "header")
 
-            # Lê a saída linha por linha, em tempo real
-            while True:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                self.log(line)
-            
-            # Espera o processo terminar
-            process.wait()
-            
-            if process.returncode == 0:
-                self.log(f"--- Script {script_name} concluído com SUCESSO. ---", "success")
-            else:
-                self.log(f"--- Script {script_name} falhou (Código: {process.returncode}). ---", "error")
+    def _arquivo_excel(self):
+        """Planilha unificada configurada no .env (ARQUIVO_EXCEL)."""
+        try:
+            from dotenv import dotenv_values
+            return dotenv_values().get("ARQUIVO_EXCEL") or NOME_ARQUIVO_EXCEL_PADRAO
+        except ImportError:
+            return os.getenv("ARQUIVO_EXCEL", NOME_ARQUIVO_EXCEL_PADRAO)
 
-        except FileNotFoundError:
-            self.log(f"ERRO: Script '{script_name}' não encontrado.", "error")
-        except Exception as e:
-            self.log(f"ERRO ao executar o script: {e}", "error")
-        
-        # Reativa os botões quando o script termina
-        self.reactivate_buttons()
+    def cancelar(self):
+        """Cancela a tarefa selecionada na tabela."""
+        id_tarefa = self._tarefa_selecionada()
+        if id_tarefa is None:
+            self.log("Selecione na fila a tarefa a cancelar.", "error")
+            return
+        if self.agendador.cancelar(id_tarefa):
+            self.log(f"Cancelamento da tarefa #{id_tarefa} solicitado. O robô para no fim do item atual.", "error")
+
+    def limpar_terminadas(self):
+        self.agendador.limpar_terminadas()
+        self._atualizar_tabela()
+
+    def _tarefa_selecionada(self):
+        selecao = self.tree.selection()
+        return int(selecao[0]) if selecao else None
+
+    def _ao_evento(self, tipo, id_tarefa, dados):
+        """Recebe os eventos do agendador (de qualquer 'thread') e põe-nos na fila da interface."""
+        if tipo == "log":
+            prefixo = f"[#{id_tarefa}] " if id_tarefa is not None else ""
+            self.log(prefixo + dados.strip())
+            return
+        if tipo == "estado" and dados["estado"] in ESTADOS_FINAIS:
+            tag = "success" if dados["estado"] == CONCLUIDA else "error"
+            self.log(f"--- Tarefa #{id_tarefa} ({dados['nome']}): {dados['estado']}. ---", tag)
+        elif tipo == "estado" and dados["estado"] == EXECUTANDO:
+            self.log(f"--- Iniciando tarefa #{id_tarefa}: {dados['script']} ---", "header")
+        self.fila_mensagens.put(("tabela", None))
 
     def log(self, message, tag=None):
         """Adiciona uma mensagem à caixa de log na interface."""
-        # A interface não pode ser atualizada por outro 'thread'
-        # root.after() agenda a atualização para ser feita pelo 'thread' principal
-        self.root.after(0, self._insert_log, message.strip(), tag)
+        # A interface não pode ser atualizada por outro 'thread'.
+        # A mensagem vai para a fila, que o 'thread' principal esvazia periodicamente.
+        self.fila_mensagens.put(("log", (message.strip(), tag)))
 
-    def _insert_log(self, message, tag):
+    def _drenar_fila(self):
+        """Esvazia a fila de mensagens de uma vez (chamado pelo root.after)."""
+        blocos = [] # Lista de [tag, [linhas]]: linhas seguidas com a mesma tag são inseridas juntas
+        atualizar_tabela = False
+
+        try:
+            while True:
+                tipo, conteudo = self.fila_mensagens.get_nowait()
+                if tipo == "tabela":
+                    atualizar_tabela = True # Basta redesenhar a tabela uma vez por lote
+                    continue
+                message, tag = conteudo
+                if blocos and blocos[-1][0] == tag:
+                    blocos[-1][1].append(message)
+                else:
+                    blocos.append([tag, [message]])
+        except queue.Empty:
+            pass
+
+        if blocos:
+            self._insert_log(blocos)
+        if atualizar_tabela:
+            self._atualizar_tabela()
+
+        self.root.after(INTERVALO_ATUALIZACAO_MS, self._drenar_fila)
+
+    def _insert_log(self, blocos):
         """Função interna para inserir o log."""
         self.log_area.config(state=tk.NORMAL) # Permite edição
-        self.log_area.insert(tk.END, message + "\n", tag)
+        for tag, linhas in blocos:
+            self.log_area.insert(tk.END, "\n".join(linhas) + "\n", tag)
+
+        # Mantém o log limitado, apagando as linhas mais antigas
+        total_linhas = int(self.log_area.index('end-1c').split('.')[0])
+        if total_linhas > MAX_LINHAS_LOG:
+            self.log_area.delete('1.0', f"{total_linhas - MAX_LINHAS_LOG + 1}.0")
+
         self.log_area.config(state=tk.DISABLED) # Bloqueia edição
         self.log_area.see(tk.END) # Rola para o final
 
-    def reactivate_buttons(self):
-        """Reativa os botões (chamado pelo root.after)."""
-        self.root.after(0, self._set_button_state, tk.NORMAL)
+    def _atualizar_tabela(self):
+        """Redesenha a tabela da fila com o estado e o progresso de cada tarefa."""
+        selecionada = self._tarefa_selecionada()
+        self.tree.delete(*self.tree.get_children())
+        for tarefa in self.agendador.tarefas():
+            progresso, eta = self._texto_progresso(tarefa.get("progresso"))
+            self.tree.insert("", tk.END, iid=str(tarefa["id"]), values=(
+                tarefa["id"], tarefa["nome"], tarefa["estado"], progresso, eta
+            ))
+        if selecionada is not None and self.tree.exists(str(selecionada)):
+            self.tree.selection_set(str(selecionada))
+        self._atualizar_barra()
 
-    def _set_button_state(self, state):
-        self.btn_add.config(state=state)
-        self.btn_process.config(state=state)
-        self.btn_upload.config(state=state)
+    def _atualizar_barra(self):
+        """Mostra na barra a tarefa selecionada ou, sem seleção, a última que está a correr."""
+        tarefas = {t["id"]: t for t in self.agendador.tarefas()}
+        tarefa = tarefas.get(self._tarefa_selecionada())
+        if tarefa is None:
+            a_correr = [t for t in tarefas.values() if t["estado"] == EXECUTANDO]
+            tarefa = a_correr[-1] if a_correr else None
+
+        if tarefa is None or not tarefa.get("progresso"):
+            self.progress_bar.config(value=0, maximum=1)
+            self.progress_label.config(text="Nenhum robô em execução." if tarefa is None else f"#{tarefa['id']}: {tarefa['estado']}")
+            return
+
+        dados = tarefa["progresso"]
+        self.progress_bar.config(maximum=max(dados["total"], 1), value=dados["feitos"])
+        progresso, eta = self._texto_progresso(dados)
+        self.progress_label.config(text=f"#{tarefa['id']} {progresso} | Tempo restante: {eta}")
+
+    def _texto_progresso(self, dados):
+        """Texto de progresso e tempo restante estimado (ETA) de uma tarefa."""
+        if not dados:
+            return "", ""
+
+        texto = f"{dados['etapa']}: {dados['feitos']}/{dados['total']} itens"
+        eta = "-"
+        if dados["por_minuto"] > 0:
+            restantes = dados["total"] - dados["feitos"]
+            segundos = int(restantes / dados["por_minuto"] * 60)
+            texto += f" | {dados['por_minuto']:.1f} itens/min"
+            eta = f"{segundos // 60:02d}:{segundos % 60:02d}"
+        if dados["falhas"]:
+            texto += f" | {dados['falhas']} falha(s)"
+        return texto, eta
 
 
 if __name__ == "__main__":
@@ -178,7 +327,7 @@ if __name__ == "__main__":
             "py -m pip install -r requirements.txt"
         )
         sys.exit(1)
-        
+
     root = tk.Tk()
     app = InterfaceApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
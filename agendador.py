@@ -0,0 +1,332 @@
+import os
+import glob
+import json
+import hashlib
+import shutil
+import subprocess
+import threading
+from datetime import datetime
+from progresso import VARIAVEL_CANCELAMENTO, ler_progresso
+
+# --- ESTADOS DE UMA TAREFA ---
+NA_FILA = "Na fila"
+EXECUTANDO = "Executando"
+CONCLUIDA = "Concluída"
+FALHOU = "Falhou"
+CANCELADA = "Cancelada"
+INTERROMPIDA = "Interrompida" # A interface foi fechada com a tarefa a meio
+ESTADOS_FINAIS = (CONCLUIDA, FALHOU, CANCELADA, INTERROMPIDA)
+# -----------------------------
+
+# Quantas tarefas terminadas ficam guardadas no histórico da fila
+MAX_TAREFAS_TERMINADAS = 50
+
+
+class EntradaRepetida(ValueError):
+    """A entrada da tarefa (mesmo conteúdo) já foi usada por outra tarefa."""
+
+
+class Agendador:
+    """
+    Fila de tarefas dos robôs, guardada em disco.
+
+    Cada tarefa pertence a um "canal" (ex: "ia" ou "navegador"). Tarefas do
+    mesmo canal correm uma de cada vez (ou até ao limite do canal), e canais
+    diferentes correm em paralelo. Assim a extração por IA e o cadastro no
+    navegador avançam ao mesmo tempo, cada um com as suas entradas.
+
+    'ao_evento(tipo, id_tarefa, dados)' é chamado a partir dos 'threads' das
+    tarefas, com tipo "log", "progresso" ou "estado".
+    As tarefas dos canais em 'canais_sem_retomar' que estavam na fila quando a
+    interface fechou não são retomadas ao reabrir (ficam como interrompidas).
+    """
+
+    def __init__(self, arquivo_fila, pasta_trabalho, limites_por_canal, ao_evento, canais_sem_retomar=()):
+        self.arquivo_fila = arquivo_fila
+        self.pasta_trabalho = pasta_trabalho
+        self.limites_por_canal = limites_por_canal
+        self.ao_evento = ao_evento
+        self.canais_sem_retomar = canais_sem_retomar
+        self.lock = threading.Lock()
+        self.lista = []
+        self.proximo_id = 1
+        os.makedirs(self.pasta_trabalho, exist_ok=True)
+
+    # --- Persistência ---
+
+    def carregar(self):
+        """
+        Lê a fila guardada. Tarefas que estavam a executar, ou na fila de um canal
+        que não é retomado, ficam como interrompidas.
+        """
+        if not os.path.exists(self.arquivo_fila):
+            self._apagar_copias_orfas()
+            return
+        try:
+            with open(self.arquivo_fila, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.ao_evento("log", None, f"Aviso: Não foi possível ler a fila guardada: {e}")
+            return
+
+        with self.lock:
+            self.lista = dados.get("tarefas", [])
+            self.proximo_id = dados.get("proximo_id", len(self.lista) + 1)
+            for tarefa in self.lista:
+                if tarefa["estado"] == EXECUTANDO or (tarefa["estado"] == NA_FILA and tarefa["canal"] in self.canais_sem_retomar):
+                    # Não recomeçamos sozinhos: um cadastro a meio repetiria produtos,
+                    # e um cadastro na fila usaria a planilha que existir agora
+                    tarefa["estado"] = INTERROMPIDA
+            self._guardar()
+        self._apagar_copias_orfas()
+
+    def _guardar(self):
+        """Grava a fila em disco (chamar com o lock adquirido)."""
+        terminadas = [t for t in self.lista if t["estado"] in ESTADOS_FINAIS]
+        excesso = len(terminadas) - MAX_TAREFAS_TERMINADAS
+        if excesso > 0:
+            antigas = {t["id"] for t in terminadas[:excesso]}
+            self.lista = [t for t in self.lista if t["id"] not in antigas]
+
+        temporario = self.arquivo_fila + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"proximo_id": self.proximo_id, "tarefas": self.lista}, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.arquivo_fila) # Troca atómica: a fila nunca fica corrompida
+
+    # --- Cópias das entradas ---
+
+    def _apagar_copia(self, tarefa):
+        """Apaga a cópia da entrada de uma tarefa terminada (chamar com o lock adquirido)."""
+        copia = tarefa.get("copia")
+        if copia and os.path.exists(copia):
+            try:
+                os.remove(copia)
+            except OSError:
+                pass # Ainda aberta (ex: pelo robô); fica para a próxima limpeza
+
+    def _apagar_copias_orfas(self):
+        """Apaga as cópias que já não pertencem a nenhuma tarefa por terminar."""
+        with self.lock:
+            em_uso = {os.path.abspath(t["copia"]) for t in self.lista if t.get("copia") and t["estado"] not in ESTADOS_FINAIS}
+        for copia in glob.glob(os.path.join(self.pasta_trabalho, "tarefa_*")):
+            if copia.endswith(".cancelar") or os.path.abspath(copia) in em_uso:
+                continue
+            try:
+                os.remove(copia)
+            except OSError:
+                pass
+
+    def _copiar_entrada(self, tarefa):
+        """
+        Copia a entrada da tarefa para a pasta de trabalho (chamar com o lock adquirido).
+        Levanta FileNotFoundError se a entrada não existir e EntradaRepetida se esta mesma
+        entrada (mesmo conteúdo) já estiver a ser ou já tiver sido usada por outra tarefa.
+        """
+        arquivo = tarefa["arquivo_entrada"]
+        if not os.path.exists(arquivo):
+            raise FileNotFoundError(f"O ficheiro '{arquivo}' não existe.")
+        with open(arquivo, 'rb') as f:
+            assinatura = hashlib.sha256(f.read()).hexdigest()
+        for outra in self.lista:
+            if (outra is not tarefa and outra.get("assinatura") == assinatura
+                    and outra["estado"] in (NA_FILA, EXECUTANDO, CONCLUIDA)):
+                raise EntradaRepetida(f"O conteúdo de '{arquivo}' já foi usado pela tarefa #{outra['id']}.")
+
+        copia = os.path.join(self.pasta_trabalho, f"tarefa_{tarefa['id']}{os.path.splitext(arquivo)[1]}")
+        shutil.copy(arquivo, copia)
+        tarefa["copia"] = copia
+        tarefa["assinatura"] = assinatura
+
+    # --- Operações da interface ---
+
+    def adicionar(self, nome, script, canal, arquivo_entrada=None, variavel_entrada=None, apos_canal=None):
+        """
+        Põe uma tarefa na fila.
+        Se 'arquivo_entrada' for indicado, ele é copiado para a pasta de trabalho e o
+        robô recebe a cópia na variável 'variavel_entrada'. Assim, a tarefa não é
+        afetada se o ficheiro original mudar entretanto.
+        Se 'apos_canal' for indicado e houver uma tarefa desse canal por terminar, a
+        nova tarefa espera que ela seja concluída e só então copia a entrada (ex: o
+        cadastro espera a extração pedida antes dele). Senão, a cópia é feita já.
+        Levanta FileNotFoundError ou EntradaRepetida (ver _copiar_entrada) se a entrada
+        não puder ser usada; nesse caso a tarefa não entra na fila.
+        """
+        with self.lock:
+            depende_de = None
+            if apos_canal:
+                pendentes = [t for t in self.lista if t["canal"] == apos_canal and t["estado"] not in ESTADOS_FINAIS]
+                if pendentes:
+                    depende_de = pendentes[-1]["id"]
+
+            tarefa = {
+                "id": self.proximo_id,
+                "nome": nome,
+                "script": script,
+                "canal": canal,
+                "arquivo_entrada": arquivo_entrada,
+                "variavel_entrada": variavel_entrada,
+                "depende_de": depende_de,
+                "estado": NA_FILA,
+                "criada": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "progresso": None,
+            }
+            if arquivo_entrada and depende_de is None:
+                self._copiar_entrada(tarefa)
+            self.proximo_id += 1
+            self.lista.append(tarefa)
+            self._guardar()
+        self.ao_evento("estado", tarefa["id"], tarefa)
+        self.despachar()
+        return tarefa
+
+    def cancelar(self, id_tarefa):
+        """Cancela uma tarefa: tira-a da fila, ou pede ao robô para parar no fim do item atual."""
+        with self.lock:
+            tarefa = self._buscar(id_tarefa)
+            if tarefa is None or tarefa["estado"] in ESTADOS_FINAIS:
+                return False
+            if tarefa["estado"] == NA_FILA:
+                tarefa["estado"] = CANCELADA
+                self._apagar_copia(tarefa)
+                self._guardar()
+            else:
+                with open(self._arquivo_cancelamento(tarefa), 'w') as f:
+                    f.write("cancelar")
+                tarefa["cancelamento_pedido"] = True
+        self.ao_evento("estado", id_tarefa, tarefa)
+        return True
+
+    def limpar_terminadas(self):
+        """Remove do histórico as tarefas já terminadas."""
+        with self.lock:
+            self.lista = [t for t in self.lista if t["estado"] not in ESTADOS_FINAIS]
+            self._guardar()
+
+    def tarefas(self):
+        """Cópia da lista de tarefas, segura para ler noutro 'thread'."""
+        with self.lock:
+            return [dict(t) for t in self.lista]
+
+    def despachar(self):
+        """Inicia as tarefas da fila que cabem nos limites de cada canal e cujas dependências terminaram."""
+        a_iniciar = []
+        canceladas = []
+        with self.lock:
+            em_execucao = {}
+            for tarefa in self.lista:
+                if tarefa["estado"] == EXECUTANDO:
+                    em_execucao[tarefa["canal"]] = em_execucao.get(tarefa["canal"], 0) + 1
+
+            for tarefa in self.lista: # Ordem de chegada
+                if tarefa["estado"] != NA_FILA:
+                    continue
+                dependencia = self._buscar(tarefa.get("depende_de"))
+                if dependencia is not None and dependencia["estado"] not in ESTADOS_FINAIS:
+                    continue # Espera a tarefa anterior
+                if dependencia is not None and dependencia["estado"] != CONCLUIDA:
+                    tarefa["estado"] = CANCELADA
+                    canceladas.append((tarefa, f"Tarefa #{dependencia['id']} não foi concluída ({dependencia['estado']}). Cancelada."))
+                    continue
+                canal = tarefa["canal"]
+                if em_execucao.get(canal, 0) >= self.limites_por_canal.get(canal, 1):
+                    continue
+                em_execucao[canal] = em_execucao.get(canal, 0) + 1
+                tarefa["estado"] = EXECUTANDO
+                tarefa["progresso"] = None
+                a_iniciar.append(tarefa)
+
+            if a_iniciar or canceladas:
+                self._guardar()
+
+        for tarefa, motivo in canceladas:
+            self.ao_evento("log", tarefa["id"], motivo)
+            self.ao_evento("estado", tarefa["id"], tarefa)
+        for tarefa in a_iniciar:
+            self.ao_evento("estado", tarefa["id"], tarefa)
+            threading.Thread(target=self._executar, args=(tarefa,), daemon=True).start()
+
+    # --- Execução ---
+
+    def _buscar(self, id_tarefa):
+        for tarefa in self.lista:
+            if tarefa["id"] == id_tarefa:
+                return tarefa
+        return None
+
+    def _arquivo_cancelamento(self, tarefa):
+        return os.path.abspath(os.path.join(self.pasta_trabalho, f"tarefa_{tarefa['id']}.cancelar"))
+
+    def _executar(self, tarefa):
+        """Corre o robô da tarefa num subprocesso (chamado num 'thread' próprio)."""
+        id_tarefa = tarefa["id"]
+        arquivo_cancelamento = self._arquivo_cancelamento(tarefa)
+        if os.path.exists(arquivo_cancelamento):
+            os.remove(arquivo_cancelamento)
+
+        # Ambiente do robô:
+        # PYTHONUNBUFFERED: a saída chega à interface em tempo real
+        # PYTHONIOENCODING: os acentos chegam corretos pelo pipe
+        # VARIAVEL_CANCELAMENTO: onde o robô procura o pedido de cancelamento
+        env = dict(os.environ)
+        env["PYTHONUNBUFFERED"] = "1"
+        env["PYTHONIOENCODING"] = "utf-8"
+        env[VARIAVEL_CANCELAMENTO] = arquivo_cancelamento
+
+        estado_final = FALHOU
+        try:
+            if tarefa["arquivo_entrada"] and not tarefa.get("copia"):
+                # A tarefa esperava outra (ex: a extração): a entrada é copiada só agora
+                with self.lock:
+                    self._copiar_entrada(tarefa)
+                self.ao_evento("log", id_tarefa, f"Entrada copiada para '{tarefa['copia']}'.")
+            if tarefa["arquivo_entrada"]:
+                env[tarefa["variavel_entrada"]] = tarefa["copia"]
+
+            # Este é o comando que você digitaria no terminal
+            process = subprocess.Popen(
+                ["py", tarefa["script"]],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                env=env,
+                creationflags=subprocess.CREATE_NO_WINDOW # (Apenas Windows) Esconde a janela do terminal
+            )
+
+            # As linhas de progresso vão para a tarefa, as restantes para o log
+            for line in process.stdout:
+                dados = ler_progresso(line)
+                if dados is not None:
+                    tarefa["progresso"] = dados
+                    self.ao_evento("progresso", id_tarefa, dados)
+                else:
+                    self.ao_evento("log", id_tarefa, line)
+
+            process.wait()
+
+            if tarefa.get("cancelamento_pedido"):
+                estado_final = CANCELADA
+            elif process.returncode == 0:
+                estado_final = CONCLUIDA
+
+        except FileNotFoundError as e:
+            self.ao_evento("log", id_tarefa, f"ERRO: Ficheiro não encontrado: {e}")
+        except EntradaRepetida as e:
+            estado_final = CANCELADA
+            self.ao_evento("log", id_tarefa, f"{e} Nada a fazer.")
+        except Exception as e:
+            self.ao_evento("log", id_tarefa, f"ERRO ao executar a tarefa: {e}")
+
+        if os.path.exists(arquivo_cancelamento):
+            os.remove(arquivo_cancelamento)
+
+        with self.lock:
+            tarefa["estado"] = estado_final
+            tarefa.pop("cancelamento_pedido", None)
+            self._apagar_copia(tarefa)
+            self._guardar()
+        self.ao_evento("estado", id_tarefa, tarefa)
+
+        # Liberta o canal para a próxima tarefa da fila
+        self.despachar()
@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import time
+import unicodedata
+import processar_cardapios
+from precos import preco_em_centavos
+
+# --- CONFIGURAÇÕES ---
+# Pasta com os cardápios de amostra. Para medir a precisão contra um gabarito,
+# coloque ao lado de cada imagem um '<nome>.json' com a lista de itens corretos
+# (mesmo formato da IA: Nome, Valor, Categoria, Descrição).
+# Sem gabarito, o resultado do modo imagem é usado como referência.
+PASTA_AMOSTRAS = "amostras_cardapios"
+# ---------------------
+
+# Compara o modo imagem (atual) com o modo OCR local + texto em cada amostra:
+# tempo de cada etapa e quantos itens (nome e preço) batem com a referência.
+# ATENÇÃO: chama a API de verdade (duas vezes por imagem) e ignora o cache.
+
+
+def normalizar(texto):
+    """Nome sem acentos, maiúsculas ou espaços extra, para comparar itens."""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+
+def comparar(referencia, obtido):
+    """Retorna (% de nomes encontrados, % de nomes encontrados com o preço certo)."""
+    if not referencia:
+        return 0.0, 0.0
+    precos_obtidos = {}
+    for item in obtido or []:
+        try:
+            precos_obtidos[normalizar(item.get("Nome", ""))] = preco_em_centavos(item.get("Valor", ""))
+        except ValueError:
+            precos_obtidos[normalizar(item.get("Nome", ""))] = None
+
+    nomes_ok = 0
+    precos_ok = 0
+    for item in referencia:
+        nome = normalizar(item.get("Nome", ""))
+        if nome in precos_obtidos:
+            nomes_ok += 1
+            try:
+                if precos_obtidos[nome] == preco_em_centavos(item.get("Valor", "")):
+                    precos_ok += 1
+            except ValueError:
+                pass
+    return 100 * nomes_ok / len(referencia), 100 * precos_ok / len(referencia)
+
+
+def medir(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    pasta = sys.argv[1] if len(sys.argv) > 1 else PASTA_AMOSTRAS
+    motor = processar_cardapios.MOTOR_OCR
+    if motor is None:
+        print("!!! ERRO: OCR local desligado. Defina OCR_LOCAL=tesseract no .env e instale o 'pytesseract'.")
+        sys.exit(1)
+
+    try:
+        categorias = processar_cardapios.carregar_categorias()
+    except ValueError as e:
+        print(f"!!! ERRO FATAL: {e}")
+        sys.exit(1)
+
+    arquivos = processar_cardapios.listar_imagens(pasta)
+    if not arquivos:
+        print(f"Nenhuma imagem encontrada em '{pasta}'.")
+        return
+
+    print(f"Comparando modo imagem x OCR local em {len(arquivos)} amostras...\n")
+    linhas = []
+    for filepath in sorted(arquivos):
+        filename = os.path.basename(filepath)
+        mime_type = "image/png" if filename.lower().endswith(".png") else "image/jpeg"
+        b64_image = processar_cardapios.image_to_base64(filepath)
+        if not b64_image:
+            continue
+
+        print(f"--- {filename} ---")
+        dados_imagem, tempo_imagem = medir(processar_cardapios.extrair_dados_do_cardapio, b64_image, mime_type, categorias)
+        ocr, tempo_ocr = medir(motor.ler, filepath)
+        dados_texto, tempo_texto = medir(processar_cardapios.extrair_dados_do_cardapio, None, mime_type, categorias,
+                                         texto_ocr=ocr.texto_com_posicoes())
+
+        gabarito = os.path.splitext(filepath)[0] + ".json"
+        if os.path.exists(gabarito):
+            with open(gabarito, 'r', encoding='utf-8') as f:
+                referencia = json.load(f)
+            origem = "gabarito"
+        else:
+            referencia = dados_imagem
+            origem = "modo imagem"
+
+        linha = {
+            "ficheiro": filename,
+            "referencia": origem,
+            "confianca_ocr": ocr.confianca_media,
+            "usaria_texto": ocr.confianca_media >= processar_cardapios.OCR_CONFIANCA_MINIMA
+                            and ocr.total_palavras >= processar_cardapios.OCR_MINIMO_PALAVRAS,
+            "tempo_imagem": tempo_imagem,
+            "tempo_texto": tempo_ocr + tempo_texto,
+            "tempo_ocr": tempo_ocr,
+            "precisao_imagem": comparar(referencia, dados_imagem),
+            "precisao_texto": comparar(referencia, dados_texto),
+        }
+        linhas.append(linha)
+        print(f"  Imagem: {tempo_imagem:.1f}s | OCR+texto: {linha['tempo_texto']:.1f}s "
+              f"(OCR {tempo_ocr:.1f}s, confiança {ocr.confianca_media:.0f})")
+        print(f"  Nomes/preços certos (vs {origem}): imagem {linha['precisao_imagem'][0]:.0f}%/{linha['precisao_imagem'][1]:.0f}% | "
+              f"texto {linha['precisao_texto'][0]:.0f}%/{linha['precisao_texto'][1]:.0f}%")
+
+    if not linhas:
+        return
+
+    print("\n" + "="*30)
+    print("Resumo:")
+    n = len(linhas)
+    print(f"  Tempo médio por imagem: modo imagem {sum(l['tempo_imagem'] for l in linhas) / n:.1f}s | "
+          f"OCR+texto {sum(l['tempo_texto'] for l in linhas) / n:.1f}s")
+    print(f"  Preços certos (média): modo imagem {sum(l['precisao_imagem'][1] for l in linhas) / n:.0f}% | "
+          f"OCR+texto {sum(l['precisao_texto'][1] for l in linhas) / n:.0f}%")
+    escolhidas = [l for l in linhas if l["usaria_texto"]]
+    print(f"  Com OCR_CONFIANCA_MINIMA={processar_cardapios.OCR_CONFIANCA_MINIMA:.0f}, {len(escolhidas)}/{n} imagens iriam em modo texto.")
+    if escolhidas:
+        print(f"  Nessas, preços certos: {sum(l['precisao_texto'][1] for l in escolhidas) / len(escolhidas):.0f}% "
+              f"(modo imagem: {sum(l['precisao_imagem'][1] for l in escolhidas) / len(escolhidas):.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
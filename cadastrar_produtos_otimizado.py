@@ -1,15 +1,28 @@
-import pandas as pd
+import re
+import sys
+import csv
 import time
+import json
+import html
+import argparse
+import tempfile
+import openpyxl
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.options import Options 
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 # --- NOVAS IMPORTAÇÕES ---
 import os # Para ler as variáveis de ambiente do sistema
 from dotenv import load_dotenv # Para carregar o arquivo .env
+from precos import preco_em_centavos
+from progresso import Progresso, cancelamento_solicitado
+import sessao_gravada
 
 # Carrega as variáveis do arquivo .env para o sistema
 load_dotenv()
@@ -27,6 +40,8 @@ SUA_SENHA = os.getenv("SENHA")
 ID_CAMPO_USUARIO = "email"
 ID_CAMPO_SENHA = "senha"
 SELETOR_BTN_LOGIN = (By.ID, "botao_logar")
+SELETOR_BTN_NOVO = (By.CSS_SELECTOR, ".btn.btn-info.fw-bold.br-5")
+SELETOR_SWAL = (By.CSS_SELECTOR, ".swal2-container.swal2-shown")
 
 # -----------------------------------------------
 
@@ -36,25 +51,144 @@ URL_DE_CADASTRO = os.getenv("CADASTRO")
 NOME_ARQUIVO_EXCEL = os.getenv("ARQUIVO_EXCEL")
 # ---------------------------------
 
-print("Iniciando o script de automação OTIMIZADO...")
-
-# 2. Configura as Opções para usar o BRAVE
-try:
-    options = Options()
-    options.binary_location = r"C:\Program Files\BraveSoftware\Brave-Browser\Application\brave.exe"
-    driver = webdriver.Chrome(options=options)
-    
-except Exception as e:
-    print(f"Erro ao iniciar o ChromeDriver: {e}")
-    print("Verifique se o 'chromedriver.exe' está na mesma pasta do script.")
-    print(r"Verifique se o caminho 'options.binary_location' está correto.")
-    exit()
-
-# 3. OTIMIZAÇÃO: Automatizando o Login
-try:
+# --- CONFIGURAÇÕES DO NAVEGADOR (OPCIONAIS NO .ENV) ---
+# NAVEGADOR: "brave" (padrão), "chrome", "chromium" ou "firefox"
+NAVEGADOR = os.getenv("NAVEGADOR", "brave").strip().lower()
+# Caminho do executável. Vazio = caminho padrão (o do Brave no Windows, ou o que o Selenium encontrar)
+CAMINHO_NAVEGADOR = os.getenv("CAMINHO_NAVEGADOR", "").strip()
+CAMINHO_BRAVE_PADRAO = r"C:\Program Files\BraveSoftware\Brave-Browser\Application\brave.exe"
+# "1" para rodar sem abrir a janela do navegador
+HEADLESS = os.getenv("HEADLESS", "0").strip() == "1"
+# "1" para bloquear imagens, fontes e scripts de rastreamento do painel (padrão)
+BLOQUEAR_RECURSOS = os.getenv("BLOQUEAR_RECURSOS", "1").strip() == "1"
+# Ficheiro onde os cookies da sessão autenticada são guardados entre execuções
+ARQUIVO_SESSAO = os.getenv("ARQUIVO_SESSAO", "sessao_painel.json")
+# (Opcional) Pasta de perfil persistente do navegador. Vazio = perfil temporário
+PASTA_PERFIL = os.getenv("PASTA_PERFIL", "").strip()
+# Pausa (segundos) depois de cada dígito do preço, para a máscara do campo 'valor' acompanhar
+PAUSA_MASCARA_PRECO = float(os.getenv("PAUSA_MASCARA_PRECO", "0.1"))
+
+# Padrões de URL bloqueados (imagens, fontes e rastreadores). Nada disto é
+# necessário para preencher o formulário, e tudo atrasa o carregamento das páginas.
+PADROES_BLOQUEADOS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*",
+]
+# ---------------------------------
+
+# Colunas que a planilha unificada precisa de ter (ver juntar_planilhas.py)
+COLUNAS_OBRIGATORIAS = ('Nome', 'Valor', 'Categoria')
+
+# Uma linha da planilha já com todos os valores prontos para o painel
+ProdutoPreparado = namedtuple(
+    "ProdutoPreparado",
+    ["numero", "nome", "categoria", "centavos", "descricao", "descricao_html"]
+)
+
+
+def criar_driver():
+    """
+    Cria o driver do Selenium de acordo com as configurações do .env
+    (navegador, modo headless, perfil e bloqueio de recursos).
+    """
+    if NAVEGADOR == "firefox":
+        options = FirefoxOptions()
+        # "eager": não espera imagens e folhas de estilo terminarem de carregar
+        options.page_load_strategy = "eager"
+        if HEADLESS:
+            options.add_argument("-headless")
+        if CAMINHO_NAVEGADOR:
+            options.binary_location = CAMINHO_NAVEGADOR
+        if PASTA_PERFIL:
+            os.makedirs(PASTA_PERFIL, exist_ok=True)
+            options.add_argument("-profile")
+            options.add_argument(PASTA_PERFIL)
+        if BLOQUEAR_RECURSOS:
+            # O Firefox não tem CDP, então bloqueamos pelas preferências
+            options.set_preference("permissions.default.image", 2)
+            options.set_preference("gfx.downloadable_fonts.enabled", False)
+            options.set_preference("privacy.trackingprotection.enabled", True)
+        driver = webdriver.Firefox(options=options)
+
+    elif NAVEGADOR in ("brave", "chrome", "chromium"):
+        options = Options()
+        options.page_load_strategy = "eager"
+        if CAMINHO_NAVEGADOR:
+            options.binary_location = CAMINHO_NAVEGADOR
+        elif NAVEGADOR == "brave":
+            options.binary_location = CAMINHO_BRAVE_PADRAO
+        if HEADLESS:
+            options.add_argument("--headless=new")
+            # Em headless não há janela para maximizar
+            options.add_argument("--window-size=1920,1080")
+        if PASTA_PERFIL:
+            options.add_argument(f"--user-data-dir={os.path.abspath(PASTA_PERFIL)}")
+        driver = webdriver.Chrome(options=options)
+
+        if BLOQUEAR_RECURSOS:
+            # Bloqueio feito pelo próprio Chromium (via CDP), antes de qualquer pedido de rede
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": PADROES_BLOQUEADOS})
+
+    else:
+        raise ValueError(f"Navegador '{NAVEGADOR}' não suportado. Use brave, chrome, chromium ou firefox.")
+
+    if not HEADLESS:
+        driver.maximize_window()
+    return driver
+
+
+def salvar_sessao(driver):
+    """Guarda os cookies da sessão autenticada para a próxima execução."""
+    try:
+        with open(ARQUIVO_SESSAO, 'w', encoding='utf-8') as f:
+            json.dump(driver.get_cookies(), f)
+        print(f"Sessão guardada em '{ARQUIVO_SESSAO}'.")
+    except Exception as e:
+        print(f"  Aviso: Não foi possível guardar a sessão: {e}")
+
+
+def restaurar_sessao(driver):
+    """
+    Tenta reaproveitar a sessão da execução anterior.
+    Retorna True se o painel abriu sem pedir login.
+    """
+    if not os.path.exists(ARQUIVO_SESSAO):
+        return False
+
+    try:
+        with open(ARQUIVO_SESSAO, 'r', encoding='utf-8') as f:
+            cookies = json.load(f)
+
+        # Os cookies só podem ser adicionados estando no domínio do painel
+        driver.get(URL_DE_LOGIN)
+        for cookie in cookies:
+            cookie.pop('sameSite', None)
+            try:
+                driver.add_cookie(cookie)
+            except Exception:
+                pass # Cookie expirado ou de outro domínio, ignoramos
+
+        driver.get(URL_DE_CADASTRO)
+
+        # Ou aparece o botão de cadastro (sessão válida) ou o formulário de login
+        WebDriverWait(driver, 10).until(EC.any_of(
+            EC.element_to_be_clickable(SELETOR_BTN_NOVO),
+            EC.visibility_of_element_located((By.ID, ID_CAMPO_USUARIO)),
+        ))
+        return len(driver.find_elements(*SELETOR_BTN_NOVO)) > 0
+
+    except Exception as e:
+        print(f"  Aviso: Não foi possível reaproveitar a sessão: {e}")
+        return False
+
+
+def fazer_login(driver):
+    """Faz o login no painel com as credenciais do .env."""
     driver.get(URL_DE_LOGIN)
-    driver.maximize_window() 
-    
+
     # Cria um objeto de "Espera Inteligente"
     wait = WebDriverWait(driver, 10)
 
@@ -78,191 +212,526 @@ try:
     print("Login realizado com sucesso!")
     print("="*30)
 
-except Exception as e:
-    print(f"!!! ERRO DURANTE O LOGIN AUTOMÁTICO: {e}")
-    print("Verifique se os IDs dos campos de login e o seletor do botão estão corretos.")
-    driver.quit()
-    exit()
-
-# Pausa para a sessão de login "assentar" no servidor
-print("Aguardando 2 segundos para a sessão de login ser registrada...")
-time.sleep(2) 
-
-# 5. Navega para a página de cadastro
-print(f"Navegando para a página de cadastro...")
-driver.get(URL_DE_CADASTRO)
-
-# 6. Carrega a planilha (sem mudança aqui)
-try:
-    if NOME_ARQUIVO_EXCEL.endswith('.xlsx'):
-        planilha = pd.read_excel(NOME_ARQUIVO_EXCEL)
-    elif NOME_ARQUIVO_EXCEL.endswith('.csv'):
-        planilha = pd.read_csv(NOME_ARQUIVO_EXCEL)
+
+class CronometroPassos:
+    """
+    Mede quanto tempo cada passo do cadastro demora, por produto e no total,
+    para comparar o custo por linha antes e depois de cada otimização.
+    Com um 'gravador' (ver sessao_gravada.py), cada passo também vai para o ficheiro da sessão.
+    """
+
+    def __init__(self, gravador=None):
+        self.totais = defaultdict(float)
+        self.passos_da_linha = {}
+        self.linhas = 0
+        self.gravador = gravador
+
+    def iniciar_linha(self, produto):
+        if self.gravador:
+            self.gravador.iniciar_produto(produto)
+
+    @contextmanager
+    def medir(self, passo):
+        if self.gravador:
+            self.gravador.iniciar_passo(passo)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.passos_da_linha[passo] = self.passos_da_linha.get(passo, 0.0) + duracao
+            self.totais[passo] += duracao
+            if self.gravador:
+                self.gravador.terminar_passo(duracao)
+
+    def fechar_linha(self):
+        """Imprime os tempos do produto atual e prepara a próxima linha."""
+        total = sum(self.passos_da_linha.values())
+        detalhes = " | ".join(f"{p} {d:.2f}s" for p, d in self.passos_da_linha.items())
+        print(f"    Tempos: {detalhes} | total {total:.2f}s")
+        self.passos_da_linha = {}
+        self.linhas += 1
+
+    def resumo(self):
+        """Imprime o custo médio de cada passo por produto."""
+        if not self.linhas:
+            return
+        print("Custo médio por produto:")
+        for passo, total in self.totais.items():
+            print(f"    {passo}: {total / self.linhas:.2f}s")
+        print(f"    TOTAL: {sum(self.totais.values()) / self.linhas:.2f}s por produto")
+
+
+def _linhas_da_planilha(arquivo):
+    """
+    Lê a planilha linha a linha (dicionários {coluna: valor}), sem a carregar
+    toda para a memória. Funciona com .xlsx (openpyxl em modo 'read_only') e .csv.
+    """
+    if arquivo.endswith('.xlsx'):
+        livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            linhas = livro.active.iter_rows(values_only=True)
+            cabecalho = [str(c).strip() if c is not None else "" for c in next(linhas, ())]
+            for valores in linhas:
+                if all(v is None for v in valores):
+                    continue # Linhas vazias (comuns no fim de planilhas editadas à mão)
+                yield dict(zip(cabecalho, valores))
+        finally:
+            livro.close() # Em 'read_only' o ficheiro fica aberto até aqui
+    elif arquivo.endswith('.csv'):
+        with open(arquivo, 'r', newline='', encoding='utf-8-sig') as f:
+            for linha in csv.DictReader(f):
+                # No CSV tudo é texto: um preço só numérico ('12.5') vira número,
+                # como o Excel (e o pandas) o leriam
+                valor = (linha.get('Valor') or "").strip()
+                if re.fullmatch(r"-?\d+(\.\d+)?", valor):
+                    linha['Valor'] = float(valor)
+                yield linha
     else:
         raise ValueError("Formato de arquivo não suportado.")
-    print(f"Sucesso! Planilha '{NOME_ARQUIVO_EXCEL}' carregada.")
-    print(f"Encontrados {len(planilha)} produtos para cadastrar.")
-except Exception as e:
-    print(f"Erro ao ler a planilha: {e}")
-    driver.quit()
-    exit()
-
-# --- OTIMIZAÇÃO: Bloco de Espera Principal ---
-# (Este bloco espera o botão "Cadastrar" aparecer antes de iniciar o loop)
-try:
-    print("Aguardando a página de cadastro carregar...")
-    SELETOR_BTN_NOVO = (By.CSS_SELECTOR, ".btn.btn-info.fw-bold.br-5")
-    # Aumentando o tempo de espera aqui para 15s por segurança
-    wait_longo = WebDriverWait(driver, 15) 
-    wait_longo.until(EC.element_to_be_clickable(SELETOR_BTN_NOVO))
-    print("Página pronta. Iniciando cadastros...")
-except Exception as e:
-    print(f"Erro ao carregar a página de cadastro: {e}")
-    print("Não foi possível encontrar o botão 'Cadastrar novo produto'.")
-    driver.quit()
-    exit()
-# ---------------------------------------------
 
-# Define o wait padrão de volta para 10s para o loop
-wait = WebDriverWait(driver, 10)
 
-# 7. Loop Principal
-for indice, linha in planilha.iterrows():
-    try:
-        nome = linha['Nome']
-        preco = linha['Valor']
-        categoria = linha['Categoria']
-        descricao = linha['Descrição']
+def contar_produtos(arquivo):
+    """
+    Confere o cabeçalho da planilha e conta as linhas, sem preparar os produtos
+    (para a barra de progresso). No .xlsx, o total vem das dimensões da folha.
+    """
+    if arquivo.endswith('.xlsx'):
+        livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            folha = livro.active
+            cabecalho = next(folha.iter_rows(max_row=1, values_only=True), ())
+            total = (folha.max_row or 1) - 1
+        finally:
+            livro.close()
+    elif arquivo.endswith('.csv'):
+        with open(arquivo, 'r', newline='', encoding='utf-8-sig') as f:
+            leitor = csv.reader(f)
+            cabecalho = next(leitor, [])
+            total = sum(1 for _ in leitor)
+    else:
+        raise ValueError("Formato de arquivo não suportado.")
+
+    cabecalho = [str(c).strip() for c in cabecalho if c is not None]
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in cabecalho]
+    if faltando:
+        raise ValueError(f"Colunas em falta na planilha: {faltando}.")
+    return total
+
+
+def validar_planilha(arquivo):
+    """
+    Prepara (e descarta) todas as linhas, para que um erro na linha 500 pare tudo
+    antes do primeiro cadastro. Lê a planilha inteira: só corre com '--validar'.
+    Retorna o número de produtos.
+    """
+    return sum(1 for _ in ler_produtos(arquivo))
+
 
-        if pd.isna(descricao):
-            descricao = ""
+def preparar_produto(numero, linha):
+    """
+    Pré-calcula tudo o que não depende do navegador (preço em centavos,
+    descrição limpa e em HTML) para que o loop de cadastro só trabalhe no painel.
+    """
+    descricao = linha.get('Descrição')
+    if descricao is None:
+        descricao = ""
+    descricao = " ".join(str(descricao).split()) # Remove quebras e espaços duplicados
 
-        print(f"\n--- Cadastrando Produto {indice + 1}/{len(planilha)}: {nome} ---")
+    for coluna in ('Nome', 'Categoria'):
+        if linha.get(coluna) is None or not str(linha[coluna]).strip():
+            raise ValueError(f"Linha {numero}: '{coluna}' vazio.")
 
-        # 8.1. Clica no botão "Cadastrar novo produto"
-        print("1. Abrindo modal de cadastro...")
-        # (Usamos a espera que já definimos, não precisa do time.sleep)
+    try:
+        centavos = preco_em_centavos(linha['Valor'])
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Linha {numero} ('{linha['Nome']}'): preço inválido '{linha['Valor']}'.") from e
+
+    return ProdutoPreparado(
+        numero=numero,
+        nome=str(linha['Nome']).strip(),
+        categoria=str(linha['Categoria']).strip(),
+        centavos=centavos,
+        descricao=descricao,
+        descricao_html=html.escape(descricao),
+    )
+
+
+def ler_produtos(arquivo):
+    """Gera os produtos já preparados, um por linha, à medida que a planilha é lida."""
+    for numero, linha in enumerate(_linhas_da_planilha(arquivo), start=1):
+        yield preparar_produto(numero, linha)
+
+
+def mapear_categorias(driver):
+    """
+    Lê de uma vez as opções do <select> de categorias do painel e devolve
+    um dicionário {nome da categoria: id}. Vazio se o select não existir.
+    """
+    try:
+        return driver.execute_script(
+            "var select = document.getElementById('id_categoria');"
+            "var mapa = {};"
+            "if (!select) { return mapa; }"
+            "for (var i = 0; i < select.options.length; i++) {"
+            "    mapa[select.options[i].text.trim()] = select.options[i].value;"
+            "}"
+            "return mapa;"
+        ) or {}
+    except Exception as e:
+        print(f"  Aviso: Não foi possível ler as categorias do painel: {e}")
+        return {}
+
+
+def selecionar_categoria(driver, wait, produto, id_categoria):
+    """Seleciona a categoria no Select2, pelo id quando já o conhecemos."""
+    if id_categoria is not None:
+        # Um único comando JS: muda o <select> e avisa o Select2 da mudança
+        selecionado = driver.execute_script(
+            "if (!window.jQuery) { return false; }"
+            "jQuery('#id_categoria').val(arguments[0]).trigger('change');"
+            "return jQuery('#id_categoria').val() == arguments[0];",
+            id_categoria
+        )
+        if selecionado:
+            return
+
+    # Plano B: busca pela caixa de pesquisa do Select2, como um utilizador faria
+    container_categoria = wait.until(EC.element_to_be_clickable((By.ID, "select2-id_categoria-container")))
+    container_categoria.click()
+
+    seletor_campo_busca = (By.XPATH, "//span[contains(@class, 'select2-dropdown')]//input[contains(@class, 'select2-search__field')]")
+    campo_busca_categoria = wait.until(EC.visibility_of_element_located(seletor_campo_busca))
+
+    driver.execute_script("arguments[0].value = arguments[1];", campo_busca_categoria, produto.categoria)
+    driver.execute_script(
+        "var event = new Event('keyup', { 'bubbles': true, 'cancelable': true });"
+        "arguments[0].dispatchEvent(event);",
+        campo_busca_categoria
+    )
+    time.sleep(1) # MANTIDO DE PROPÓSITO para o filtro
+
+    seletor_resultado = (By.XPATH, f"//ul[contains(@class, 'select2-results__options')]//li[text()='{produto.categoria}']")
+    resultado_categoria = wait.until(EC.element_to_be_clickable(seletor_resultado))
+    resultado_categoria.click()
+    time.sleep(1) # MANTIDO DE PROPÓSITO para fechar
+
+
+def preencher_descricao(driver, wait, produto):
+    """Preenche a descrição pela API JS do CKEditor (sem trocar de iframe)."""
+    preenchido = driver.execute_script(
+        "if (!window.CKEDITOR) { return false; }"
+        "var nomes = Object.keys(CKEDITOR.instances);"
+        "if (!nomes.length) { return false; }"
+        "var editor = CKEDITOR.instances['descricao'] || CKEDITOR.instances[nomes[nomes.length - 1]];"
+        "editor.setData(arguments[0]);"
+        "editor.updateElement();"
+        "return true;",
+        produto.descricao_html
+    )
+    if preenchido:
+        return
+
+    # Plano B: digita dentro do iframe do editor
+    seletor_iframe = (By.CSS_SELECTOR, ".cke_wysiwyg_frame.cke_reset")
+    iframe_descricao = wait.until(EC.visibility_of_element_located(seletor_iframe))
+    # Ao gravar/repetir (sessao_gravada.py) o elemento vem embrulhado e o switch_to.frame precisa do original
+    driver.switch_to.frame(getattr(iframe_descricao, "wrapped_element", iframe_descricao))
+
+    editor_body = wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    editor_body.clear()
+    editor_body.send_keys(produto.descricao)
+    driver.switch_to.default_content()
+
+
+def cadastrar_produto(driver, wait, wait_longo, produto, id_categoria, cronometro):
+    """Cadastra um único produto, do clique em "novo produto" até o pop-up de sucesso."""
+
+    # 8.1. Clica no botão "Cadastrar novo produto"
+    print("1. Abrindo modal de cadastro...")
+    with cronometro.medir("modal"):
         btn_novo_produto = wait.until(EC.element_to_be_clickable(SELETOR_BTN_NOVO))
-        btn_novo_produto.click()
+        # Clique via JS: não é bloqueado pelo fundo do SweetAlert anterior, que ainda pode estar a desaparecer
+        driver.execute_script("arguments[0].click();", btn_novo_produto)
 
         # 8.2. Clica no botão de rádio "produto sem estoque"
         print("2. Marcando 'sem estoque'...")
         radio_sem_estoque = wait.until(EC.element_to_be_clickable((By.ID, "produto_sem_estoque")))
         radio_sem_estoque.click()
 
-        # 8.3. Preenche o Nome do produto
-        print(f"3. Preenchendo Nome: {nome}")
+    # 8.3. Preenche o Nome do produto
+    print(f"3. Preenchendo Nome: {produto.nome}")
+    with cronometro.medir("nome"):
         campo_nome = wait.until(EC.visibility_of_element_located((By.ID, "nome")))
-        campo_nome.clear() 
-        campo_nome.send_keys(nome) 
+        campo_nome.clear()
+        campo_nome.send_keys(produto.nome)
 
-        # 8.4. Preenche o Valor do produto (LÓGICA INALTERADA - JÁ ESTÁ OTIMIZADA)
-        print(f"4. Preenchendo Preço: {preco}")
+    # 8.4. Preenche o Valor do produto (já convertido em centavos)
+    print(f"4. Preenchendo Preço: {produto.centavos} centavos")
+    with cronometro.medir("preco"):
         try:
-            preco_limpo = str(preco)
-            preco_limpo = "".join(filter(lambda c: c.isdigit() or c == ',', preco_limpo))
-            preco_limpo = preco_limpo.replace(',', '.')
-            if not preco_limpo:
-                preco_limpo = "0"
-            preco_float = float(preco_limpo)
-            preco_centavos = preco_float * 100
-            preco_final_para_enviar = str(int(preco_centavos))
-            
             campo_valor = wait.until(EC.visibility_of_element_located((By.ID, "valor")))
             campo_valor.clear()
-            
-            print(f"    (Digitando {preco_final_para_enviar} humanamente...)")
-            for digito in preco_final_para_enviar:
+
+            for digito in produto.centavos:
                 campo_valor.send_keys(digito)
-                time.sleep(0.1) # MANTIDO DE PROPÓSITO para a máscara
+                if PAUSA_MASCARA_PRECO:
+                    time.sleep(PAUSA_MASCARA_PRECO) # MANTIDO DE PROPÓSITO para a máscara
 
         except Exception as e:
-            print(f"!!! ERRO ao limpar ou preencher o PREÇO: {e}")
+            print(f"!!! ERRO ao preencher o PREÇO: {e}")
             raise e
 
-        # 8.5. Preenche a Categoria (LÓGICA INALTERADA - JÁ ESTÁ OTIMIZADA)
-        print(f"5. Preenchendo Categoria: {categoria}...")
+    # 8.5. Preenche a Categoria
+    print(f"5. Preenchendo Categoria: {produto.categoria}...")
+    with cronometro.medir("categoria"):
         try:
-            container_categoria = wait.until(EC.element_to_be_clickable((By.ID, "select2-id_categoria-container")))
-            container_categoria.click()
-
-            seletor_campo_busca = (By.XPATH, "//span[contains(@class, 'select2-dropdown')]//input[contains(@class, 'select2-search__field')]")
-            campo_busca_categoria = wait.until(EC.visibility_of_element_located(seletor_campo_busca))
-            
-            driver.execute_script("arguments[0].value = arguments[1];", campo_busca_categoria, categoria)
-            driver.execute_script(
-                "var event = new Event('keyup', { 'bubbles': true, 'cancelable': true });"
-                "arguments[0].dispatchEvent(event);", 
-                campo_busca_categoria
-            )
-            time.sleep(1) # MANTIDO DE PROPÓSITO para o filtro
-            
-            seletor_resultado = (By.XPATH, f"//ul[contains(@class, 'select2-results__options')]//li[text()='{categoria}']")
-            resultado_categoria = wait.until(EC.element_to_be_clickable(seletor_resultado))
-            resultado_categoria.click()
-            time.sleep(1) # MANTIDO DE PROPÓSITO para fechar
-            
+            selecionar_categoria(driver, wait, produto, id_categoria)
         except Exception as e:
             print(f"!!! ERRO ao tentar preencher a categoria (Select2): {e}")
             raise e
 
-        # 8.6. Preenche a Descrição
-        print(f"6. Preenchendo Descrição...")
-        seletor_iframe = (By.CSS_SELECTOR, ".cke_wysiwyg_frame.cke_reset")
-        iframe_descricao = wait.until(EC.visibility_of_element_located(seletor_iframe))
-        driver.switch_to.frame(iframe_descricao)
-        
-        editor_body = wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        editor_body.clear()
-        editor_body.send_keys(descricao)
-        driver.switch_to.default_content()
-
-        # 8.7. Clica no link "Próximo" (LÓGICA INALTERADA - JÁ ESTÁ OTIMIZADA)
-        print("7. Clicando em 'Próximo'...")
+    # 8.6. Preenche a Descrição
+    print(f"6. Preenchendo Descrição...")
+    with cronometro.medir("descricao"):
+        preencher_descricao(driver, wait, produto)
+
+    # 8.7. Clica no link "Próximo" (LÓGICA INALTERADA - JÁ ESTÁ OTIMIZADA)
+    print("7. Clicando em 'Próximo'...")
+    with cronometro.medir("proximo"):
         try:
             proximo_link = wait.until(EC.visibility_of_element_located((By.LINK_TEXT, "Próximo")))
             driver.execute_script("arguments[0].click();", proximo_link)
-            
+
         except Exception as e:
             print(f"!!! ERRO ao clicar em 'Próximo': {e}")
             raise e
 
-        # 8.8. Clica no link "Finalizar" (LÓGICA OTIMIZADA COM SWEETALERT)
-        print("8. Clicando em 'Finalizar'...")
+    # 8.8. Clica no link "Finalizar" (LÓGICA OTIMIZADA COM SWEETALERT)
+    print("8. Clicando em 'Finalizar'...")
+    with cronometro.medir("finalizar"):
         try:
             finalizar_link = wait.until(EC.visibility_of_element_located((By.LINK_TEXT, "Finalizar")))
             driver.execute_script("arguments[0].click();", finalizar_link)
-            
+
             print("Aguardando salvamento (esperando modal fechar)...")
             wait.until(EC.staleness_of(finalizar_link)) # Espera o modal antigo sumir
 
             # --- Tratamento do Pop-up "SweetAlert" ---
+            # Só esperamos o pop-up APARECER (confirmação do salvamento).
+            # Não esperamos a animação de saída: fechamos o pop-up e seguimos para o próximo modal.
             print("Aguardando pop-up de sucesso...")
-            SELETOR_SWAL = (By.CSS_SELECTOR, ".swal2-container.swal2-shown")
-            
-            # Espera o pop-up APARECER
             wait_longo.until(EC.visibility_of_element_located(SELETOR_SWAL))
-            
-            print("Pop-up encontrado. Aguardando pop-up DESAPARECER...")
-            # Espera o pop-up DESAPARECER
-            wait_longo.until(EC.invisibility_of_element_located(SELETOR_SWAL))
+            driver.execute_script("if (window.Swal) { Swal.close(); }")
             # --- Fim do tratamento ---
 
-            print(f"SUCESSO! Produto '{nome}' cadastrado.")
-            
         except Exception as e:
             print(f"!!! ERRO ao clicar em 'Finalizar' ou aguardar salvamento: {e}")
             raise e
 
+    print(f"SUCESSO! Produto '{produto.nome}' cadastrado.")
+
+
+def usar_painel_simulado(url_base):
+    """Aponta o robô para o painel simulado local (modo de repetição)."""
+    global URL_DE_LOGIN, URL_DE_CADASTRO, SEU_USUARIO, SUA_SENHA, ARQUIVO_SESSAO, PAUSA_MASCARA_PRECO
+    URL_DE_LOGIN = f"{url_base}/login.html"
+    URL_DE_CADASTRO = f"{url_base}/cadastro.html"
+    # O painel simulado aceita qualquer login; a sessão real nunca é tocada
+    SEU_USUARIO = SUA_SENHA = "simulado"
+    ARQUIVO_SESSAO = os.path.join(tempfile.gettempdir(), "sessao_painel_simulado.json")
+    # A máscara do painel simulado formata cada dígito na hora: a repetição corre sem pausas
+    PAUSA_MASCARA_PRECO = 0
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Cadastra no painel os produtos da planilha unificada.")
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--gravar", metavar="SESSAO.jsonl",
+                      help="Grava os passos e as interações com o painel (real) neste ficheiro.")
+    modo.add_argument("--repetir", metavar="SESSAO.jsonl",
+                      help="Repete uma sessão gravada contra o painel simulado local e compara os tempos.")
+    parser.add_argument("--saida", metavar="SESSAO.jsonl",
+                        help="Onde gravar a repetição (padrão: '<sessão>_repeticao.jsonl').")
+    parser.add_argument("--validar", action="store_true",
+                        help="Confere todas as linhas da planilha antes de abrir o navegador.")
+    return parser.parse_args()
+
+
+def executar_cadastro(produtos, total_produtos, gravador=None):
+    """
+    Abre o navegador, entra no painel e cadastra os produtos.
+    Retorna True só se todos os produtos foram cadastrados.
+    """
+    # 2. Cria o navegador configurado no .env
+    try:
+        driver = criar_driver()
+        if gravador:
+            driver = gravador.envolver(driver)
+
+    except Exception as e:
+        print(f"Erro ao iniciar o navegador '{NAVEGADOR}': {e}")
+        print("Verifique se o driver do navegador está na mesma pasta do script.")
+        print("Verifique se o caminho 'CAMINHO_NAVEGADOR' do .env está correto.")
+        return False
+
+    # 3. OTIMIZAÇÃO: Reaproveita a sessão anterior ou faz o login automático
+    print("Verificando sessão guardada...")
+    if restaurar_sessao(driver):
+        print("Sessão anterior ainda válida. Login ignorado.")
+    else:
+        try:
+            fazer_login(driver)
+
+        except Exception as e:
+            print(f"!!! ERRO DURANTE O LOGIN AUTOMÁTICO: {e}")
+            print("Verifique se os IDs dos campos de login e o seletor do botão estão corretos.")
+            driver.quit()
+            return False
+
+        # Pausa para a sessão de login "assentar" no servidor
+        print("Aguardando 2 segundos para a sessão de login ser registrada...")
+        time.sleep(2)
+        salvar_sessao(driver)
+
+        # 5. Navega para a página de cadastro
+        print(f"Navegando para a página de cadastro...")
+        driver.get(URL_DE_CADASTRO)
+
+    # --- OTIMIZAÇÃO: Bloco de Espera Principal ---
+    # (Este bloco espera o botão "Cadastrar" aparecer antes de iniciar o loop)
+    try:
+        print("Aguardando a página de cadastro carregar...")
+        # Aumentando o tempo de espera aqui para 15s por segurança
+        wait_longo = WebDriverWait(driver, 15)
+        wait_longo.until(EC.element_to_be_clickable(SELETOR_BTN_NOVO))
+        print("Página pronta. Iniciando cadastros...")
     except Exception as e:
-        print(f"\n!!!!!! ERRO GERAL AO CADASTRAR: {nome} !!!!!!")
-        print(f"Erro: {e}")
+        print(f"Erro ao carregar a página de cadastro: {e}")
+        print("Não foi possível encontrar o botão 'Cadastrar novo produto'.")
+        driver.quit()
+        return False
+    # ---------------------------------------------
+
+    # 6. Resolve os ids de todas as categorias do painel de uma só vez
+    mapa_categorias = mapear_categorias(driver)
+
+    # Define o wait padrão de volta para 10s para o loop
+    wait = WebDriverWait(driver, 10)
+    cronometro = CronometroPassos(gravador)
+    progresso = Progresso(total_produtos, etapa="Cadastro")
+
+    # 7. Loop Principal
+    sucesso = False
+    try:
+        for produto in produtos:
+            # Cancelamento pedido pela interface: para entre dois produtos, nunca a meio de um
+            if cancelamento_solicitado():
+                print("\nCancelamento solicitado. Parando antes do próximo produto.")
+                break
+
+            id_categoria = mapa_categorias.get(produto.categoria)
+            if mapa_categorias and id_categoria is None:
+                print(f"Aviso: categoria '{produto.categoria}' não encontrada no painel (será buscada no Select2).")
+
+            try:
+                print(f"\n--- Cadastrando Produto {produto.numero}/{total_produtos}: {produto.nome} ---")
+                cronometro.iniciar_linha(produto)
+                cadastrar_produto(driver, wait, wait_longo, produto, id_categoria, cronometro)
+                cronometro.fechar_linha()
+                progresso.avancar()
+
+            except Exception as e:
+                progresso.avancar(falhou=True)
+                print(f"\n!!!!!! ERRO GERAL AO CADASTRAR: {produto.nome} !!!!!!")
+                print(f"Erro: {e}")
+                print("O script será INTERROMPIDO.")
+                print("Limpando foco do iframe (por segurança)...")
+                driver.switch_to.default_content()
+                break
+        else:
+            sucesso = True
+
+    except ValueError as e:
+        # Erro ao ler ou preparar uma linha da planilha (ex: preço inválido)
+        print(f"\n!!!!!! ERRO NA PLANILHA: {e} !!!!!!")
         print("O script será INTERROMPIDO.")
-        print("Limpando foco do iframe (por segurança)...")
-        driver.switch_to.default_content() 
-        break 
-
-# 10. Finalização
-print("\n="*30)
-print("Automação otimizada concluída!")
-driver.quit()
\ No newline at end of file
+
+    # 10. Finalização
+    print("\n="*30)
+    cronometro.resumo()
+    # Guarda de novo os cookies (também quando a sessão foi reaproveitada):
+    # o painel pode tê-los renovado durante a execução
+    salvar_sessao(driver)
+    if sucesso:
+        print("Automação otimizada concluída!")
+    else:
+        print("Automação otimizada interrompida: nem todos os produtos foram cadastrados.")
+    driver.quit()
+    return sucesso
+
+
+def main():
+    argumentos = ler_argumentos()
+    print("Iniciando o script de automação OTIMIZADO...")
+    gravador = None
+    servidor = None
+
+    if argumentos.repetir:
+        # Modo de repetição: os produtos vêm da sessão gravada e o painel é a cópia local
+        try:
+            _, produtos_gravados, _ = sessao_gravada.ler_sessao(argumentos.repetir)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler a sessão gravada '{argumentos.repetir}': {e}")
+            sys.exit(1)
+        if not produtos_gravados:
+            print(f"A sessão '{argumentos.repetir}' não tem produtos.")
+            sys.exit(1)
+        servidor, url_base = sessao_gravada.iniciar_painel_simulado(p["categoria"] for p in produtos_gravados)
+        usar_painel_simulado(url_base)
+        print(f"Repetindo {len(produtos_gravados)} produtos de '{argumentos.repetir}' no painel simulado ({url_base}).")
+        total_produtos = len(produtos_gravados)
+        produtos = (ProdutoPreparado(**p) for p in produtos_gravados)
+        saida = argumentos.saida or os.path.splitext(argumentos.repetir)[0] + "_repeticao.jsonl"
+        gravador = sessao_gravada.GravadorSessao(saida, "repeticao", origem=os.path.basename(argumentos.repetir))
+    else:
+        # 1. Só confere o cabeçalho e conta as linhas: o navegador abre logo e os produtos
+        #    são lidos e preparados um a um, durante o cadastro (um erro numa linha para o
+        #    cadastro nessa linha). Com '--validar', todas as linhas são conferidas antes.
+        try:
+            total_produtos = contar_produtos(NOME_ARQUIVO_EXCEL)
+            if argumentos.validar:
+                total_produtos = validar_planilha(NOME_ARQUIVO_EXCEL)
+                print("Todas as linhas da planilha são válidas.")
+            print(f"Sucesso! Planilha '{NOME_ARQUIVO_EXCEL}' aberta.")
+            print(f"Encontrados {total_produtos} produtos para cadastrar.")
+        except Exception as e:
+            print(f"Erro ao ler a planilha: {e}")
+            sys.exit(1)
+        produtos = ler_produtos(NOME_ARQUIVO_EXCEL)
+        if argumentos.gravar:
+            gravador = sessao_gravada.GravadorSessao(argumentos.gravar, "gravacao", navegador=NAVEGADOR, headless=HEADLESS)
+            print(f"Gravando a sessão em '{argumentos.gravar}'.")
+
+    try:
+        sucesso = executar_cadastro(produtos, total_produtos, gravador)
+    finally:
+        produtos.close() # Fecha a planilha, mesmo se o loop parou a meio
+        if gravador:
+            gravador.fechar()
+        if servidor:
+            servidor.shutdown()
+
+    if argumentos.repetir:
+        print()
+        sessao_gravada.comparar_sessoes(argumentos.repetir, gravador.caminho)
+
+    # Código de saída != 0: a fila de tarefas e o modo em lote mostram o cadastro como falhado
+    # (e a mesma planilha pode ser posta na fila de novo)
+    if not sucesso:
+        sys.exit(1)
+
+
+# Roda a função principal
+if __name__ == "__main__":
+    main()
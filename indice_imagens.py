@@ -0,0 +1,213 @@
+import os
+import json
+import glob
+import uuid
+import threading
+import tempfile
+from PIL import Image
+
+# --- CONFIGURAÇÕES ---
+NOME_FICHEIRO_INDICE = "indice_phash.json" # Guardado dentro da pasta de imagens arquivadas
+# O hash tem 64 bits, dividido em 8 "faixas" de 8 bits para a busca rápida.
+# Se duas imagens diferem em até 7 bits, pelo menos uma faixa é idêntica,
+# então basta comparar as imagens que partilham alguma faixa.
+BITS_HASH = 64
+NUMERO_FAIXAS = 8
+BITS_FAIXA = BITS_HASH // NUMERO_FAIXAS
+EXTENSOES_IMAGEM = ("*.png", "*.jpg", "*.jpeg")
+# ---------------------
+
+
+def dhash(filepath):
+    """
+    Hash perceptual (dHash) de 64 bits: compara o brilho de pixels vizinhos numa
+    miniatura 9x8. Imagens quase iguais (outro screenshot, recompressão, pequena
+    mudança de tamanho) têm hashes com poucos bits diferentes.
+    """
+    with Image.open(filepath) as img:
+        miniatura = img.convert("L").resize((9, 8), Image.LANCZOS)
+        pixels = list(miniatura.getdata())
+
+    valor = 0
+    for linha in range(8):
+        for coluna in range(8):
+            esquerda = pixels[linha * 9 + coluna]
+            direita = pixels[linha * 9 + coluna + 1]
+            valor = (valor << 1) | (1 if esquerda > direita else 0)
+    return valor
+
+
+def distancia(hash_a, hash_b):
+    """Distância de Hamming: quantos bits diferem entre os dois hashes."""
+    return bin(hash_a ^ hash_b).count("1")
+
+
+def _faixas(valor):
+    mascara = (1 << BITS_FAIXA) - 1
+    return [(i, (valor >> (i * BITS_FAIXA)) & mascara) for i in range(NUMERO_FAIXAS)]
+
+
+class IndiceImagens:
+    """
+    Índice persistente dos hashes das imagens já processadas de uma pasta.
+
+    Cada entrada tem um 'id' único e guarda o ficheiro (nome na pasta de arquivo),
+    o hash e, quando existe, a chave do cache da extração (ver
+    processar_cardapios.chave_cache) ou o id da entrada de que é duplicado.
+    O nome do ficheiro não identifica a entrada: screenshots diferentes chegam
+    muitas vezes com o mesmo nome ('image.png', 'WhatsApp Image...').
+    Uma original fica 'pendente' até a extração terminar (ver concluir e remover).
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.caminho = os.path.join(pasta, NOME_FICHEIRO_INDICE)
+        self.lock = threading.Lock()
+        self.condicao = threading.Condition(self.lock) # Avisa quando uma original pendente termina
+        self.entradas = {} # id -> entrada
+        self.faixas = {} # (número da faixa, valor) -> conjunto de ids
+        self._carregar()
+
+    def _carregar(self):
+        if os.path.exists(self.caminho):
+            try:
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    for entrada in json.load(f):
+                        if entrada.get("pendente"):
+                            continue # Extração interrompida: a imagem continua na entrada
+                        entrada.setdefault("id", uuid.uuid4().hex) # Índices antigos não tinham id
+                        if "duplicado_de" in entrada:
+                            self.entradas[entrada["id"]] = entrada
+                        else:
+                            self._indexar(entrada)
+                return
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"  Aviso: Índice de imagens '{self.caminho}' ilegível ({e}). Reconstruindo...")
+                self.entradas = {}
+                self.faixas = {}
+
+        # Primeira vez: indexa as imagens que já estavam arquivadas
+        arquivos = []
+        for extensao in EXTENSOES_IMAGEM:
+            arquivos.extend(glob.glob(os.path.join(self.pasta, extensao)))
+        for filepath in arquivos:
+            filename = os.path.basename(filepath)
+            if filename.startswith(("CORROMPIDO_", "DUPLICADO_")):
+                continue
+            try:
+                self._indexar({"id": uuid.uuid4().hex, "ficheiro": filename, "hash": format(dhash(filepath), "016x")})
+            except Exception:
+                pass # Imagem ilegível: simplesmente não entra no índice
+        if self.entradas:
+            print(f"  Índice de imagens criado com {len(self.entradas)} imagens de '{self.pasta}'.")
+            self._guardar()
+
+    def _indexar(self, entrada):
+        valor = int(entrada["hash"], 16)
+        self.entradas[entrada["id"]] = entrada
+        for faixa in _faixas(valor):
+            self.faixas.setdefault(faixa, set()).add(entrada["id"])
+
+    def _desindexar(self, id_entrada):
+        entrada = self.entradas.pop(id_entrada, None)
+        if entrada is None or "duplicado_de" in entrada:
+            return
+        for faixa in _faixas(int(entrada["hash"], 16)):
+            self.faixas.get(faixa, set()).discard(id_entrada)
+
+    def _guardar(self):
+        os.makedirs(self.pasta, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.pasta, suffix=".tmp", delete=False) as f:
+            json.dump(list(self.entradas.values()), f, ensure_ascii=False)
+        os.replace(f.name, self.caminho)
+
+    def _buscar(self, valor, distancia_maxima):
+        """Imagem indexada mais parecida, a até 'distancia_maxima' bits. Retorna (entrada, distância) ou None."""
+        if distancia_maxima < NUMERO_FAIXAS:
+            candidatos = set()
+            for faixa in _faixas(valor):
+                candidatos |= self.faixas.get(faixa, set())
+        else:
+            candidatos = self.entradas.keys() # Limite grande demais para as faixas: compara com todas
+
+        melhor = None
+        for id_entrada in candidatos:
+            entrada = self.entradas[id_entrada]
+            if "duplicado_de" in entrada:
+                continue # Compara sempre com a imagem original
+            d = distancia(valor, int(entrada["hash"], 16))
+            if d <= distancia_maxima and (melhor is None or d < melhor[1]):
+                melhor = (entrada, d)
+        return melhor
+
+    def verificar_e_registrar(self, ficheiro, valor, distancia_maxima):
+        """
+        Procura uma imagem parecida e regista a nova imagem, como duplicado da
+        parecida ou como original (pendente). Tudo de uma vez, para que dois threads
+        não deixem passar o mesmo cardápio.
+        Se a parecida ainda estiver pendente, espera que a extração dela termine:
+        se falhar, a nova imagem é que fica como original.
+        Retorna (id da nova entrada, (entrada parecida, distância) ou None).
+        """
+        with self.condicao:
+            encontrado = self._buscar(valor, distancia_maxima)
+            while encontrado is not None and encontrado[0].get("pendente"):
+                self.condicao.wait()
+                encontrado = self._buscar(valor, distancia_maxima)
+            entrada = {"id": uuid.uuid4().hex, "ficheiro": ficheiro, "hash": format(valor, "016x")}
+            if encontrado is not None:
+                entrada["duplicado_de"] = encontrado[0]["id"]
+                # Duplicados ficam registados mas não entram nas faixas (a original já as ocupa)
+                self.entradas[entrada["id"]] = entrada
+            else:
+                entrada["pendente"] = True
+                self._indexar(entrada)
+            self._guardar()
+            return entrada["id"], encontrado
+
+    def atualizar(self, id_entrada, **campos):
+        """Acrescenta informação a uma entrada (ex: a chave do cache ou o nome final no arquivo)."""
+        with self.lock:
+            if id_entrada in self.entradas:
+                self.entradas[id_entrada].update(campos)
+                self._guardar()
+
+    def concluir(self, id_entrada, **campos):
+        """Marca a extração de uma original como bem-sucedida (com o nome final no arquivo, etc.)."""
+        with self.lock:
+            if id_entrada in self.entradas:
+                self.entradas[id_entrada].pop("pendente", None)
+                self.entradas[id_entrada].update(campos)
+                self._guardar()
+            self.condicao.notify_all()
+
+    def remover(self, id_entrada):
+        """Tira uma imagem do índice (ex: a extração falhou e a imagem vai ser reprocessada)."""
+        with self.lock:
+            self._desindexar(id_entrada)
+            self._guardar()
+            self.condicao.notify_all()
+
+
+def nome_no_arquivo(pasta, ficheiro, sufixo):
+    """
+    Nome com que 'ficheiro' é arquivado em 'pasta': o próprio nome ou, se já
+    existir lá um ficheiro com esse nome, o nome com '_<sufixo>' antes da extensão.
+    """
+    if not os.path.exists(os.path.join(pasta, ficheiro)):
+        return ficheiro
+    base, extensao = os.path.splitext(ficheiro)
+    return f"{base}_{sufixo}{extensao}"
+
+
+# Um índice por pasta, partilhado entre os threads do processo
+_INDICES = {}
+_LOCK_INDICES = threading.Lock()
+
+
+def obter_indice(pasta):
+    with _LOCK_INDICES:
+        chave = os.path.abspath(pasta)
+        if chave not in _INDICES:
+            _INDICES[chave] = IndiceImagens(pasta)
+        return _INDICES[chave]
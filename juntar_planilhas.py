@@ -10,7 +10,7 @@ PASTA_ARQUIVADAS = "planilhas_arquivadas"
 NOME_ARQUIVO_UNIFICADO = "planilha_cardapio_RPA.xlsx"
 # ---------------------
 
-def arquivar_planilha_antiga(caminho_unificado):
+def arquivar_planilha_antiga(caminho_unificado, pasta_arquivadas=PASTA_ARQUIVADAS):
     """
     Verifica se a planilha unificada já existe. Se sim, move para a pasta
     de arquivadas com um ID sequencial.
@@ -18,17 +18,18 @@ def arquivar_planilha_antiga(caminho_unificado):
     if not os.path.exists(caminho_unificado):
         return # Não há nada para arquivar
 
-    print(f"Encontrado ficheiro antigo: '{NOME_ARQUIVO_UNIFICADO}'. Arquivando...")
+    nome_unificado = os.path.basename(caminho_unificado)
+    print(f"Encontrado ficheiro antigo: '{nome_unificado}'. Arquivando...")
     
     # (A pasta já terá sido criada pela função 'main')
     
     # Encontra o próximo ID sequencial disponível
     id_seq = 1
     while True:
-        nome_base_sem_ext = os.path.splitext(NOME_ARQUIVO_UNIFICADO)[0]
+        nome_base_sem_ext = os.path.splitext(nome_unificado)[0]
         nome_arquivado = f"{nome_base_sem_ext}_{id_seq}.xlsx"
         
-        caminho_arquivado = os.path.join(PASTA_ARQUIVADAS, nome_arquivado)
+        caminho_arquivado = os.path.join(pasta_arquivadas, nome_arquivado)
         
         if not os.path.exists(caminho_arquivado):
             os.rename(caminho_unificado, caminho_arquivado)
@@ -37,17 +38,19 @@ def arquivar_planilha_antiga(caminho_unificado):
         
         id_seq += 1 
 
-def juntar_planilhas():
+def juntar_planilhas(pasta_prontas=PASTA_PLANILHAS_PRONTAS, caminho_unificado=None):
     """
     Junta todas as planilhas da pasta 'planilhas_prontas' em um único
     ficheiro Excel, limpando os dados e depois apagando os ficheiros originais.
     """
+    if caminho_unificado is None:
+        caminho_unificado = os.path.join(".", NOME_ARQUIVO_UNIFICADO)
     
     # 1. Procura todos os ficheiros .xlsx na pasta de planilhas prontas
-    arquivos_excel = glob.glob(os.path.join(PASTA_PLANILHAS_PRONTAS, "*.xlsx"))
+    arquivos_excel = glob.glob(os.path.join(pasta_prontas, "*.xlsx"))
     
     if not arquivos_excel:
-        print(f"Nenhum ficheiro .xlsx encontrado em '{PASTA_PLANILHAS_PRONTAS}'.")
+        print(f"Nenhum ficheiro .xlsx encontrado em '{pasta_prontas}'.")
         return False 
 
     print(f"Encontrados {len(arquivos_excel)} ficheiros para unificar...")
@@ -75,7 +78,6 @@ def juntar_planilhas():
     df_unificado = df_unificado[['Categoria', 'Nome', 'Valor', 'Descrição']]
     
     # 5. Salva a nova planilha unificada
-    caminho_unificado = os.path.join(".", NOME_ARQUIVO_UNIFICADO)
     df_unificado.to_excel(caminho_unificado, index=False)
     
     print("\n--- Sucesso! ---")
@@ -83,7 +85,7 @@ def juntar_planilhas():
     print(f"{caminho_unificado}")
     
     # 6. Apaga os ficheiros individuais que acabaram de ser juntados.
-    print(f"\nLimpando {len(arquivos_excel)} planilhas individuais de '{PASTA_PLANILHAS_PRONTAS}'...")
+    print(f"\nLimpando {len(arquivos_excel)} planilhas individuais de '{pasta_prontas}'...")
     arquivos_removidos = 0
     for f in arquivos_excel:
         try:
@@ -96,27 +98,33 @@ def juntar_planilhas():
     
     return True # Retorna Verdadeiro para indicar que uma nova planilha foi criada
 
-def main():
+def main(pasta_prontas=PASTA_PLANILHAS_PRONTAS, pasta_arquivadas=PASTA_ARQUIVADAS, caminho_unificado=None):
+    """
+    Sem argumentos, usa as pastas padrão do projeto. O modo em lote
+    (processar_clientes.py) passa as pastas de cada cliente.
+    """
     print("Iniciando Robô Unificador de Planilhas...")
     
     # Garante que TODAS as pastas de trabalho do unificador existam
-    print(f"Verificando pasta de planilhas prontas: '{PASTA_PLANILHAS_PRONTAS}'")
-    os.makedirs(PASTA_PLANILHAS_PRONTAS, exist_ok=True)
-    print(f"Verificando pasta de arquivadas: '{PASTA_ARQUIVADAS}'")
-    os.makedirs(PASTA_ARQUIVADAS, exist_ok=True)
+    print(f"Verificando pasta de planilhas prontas: '{pasta_prontas}'")
+    os.makedirs(pasta_prontas, exist_ok=True)
+    print(f"Verificando pasta de arquivadas: '{pasta_arquivadas}'")
+    os.makedirs(pasta_arquivadas, exist_ok=True)
     
-    caminho_unificado = os.path.join(".", NOME_ARQUIVO_UNIFICADO)
+    if caminho_unificado is None:
+        caminho_unificado = os.path.join(".", NOME_ARQUIVO_UNIFICADO)
     
     # 1. Arquiva a planilha antiga, se existir
-    arquivar_planilha_antiga(caminho_unificado)
+    arquivar_planilha_antiga(caminho_unificado, pasta_arquivadas)
     
     # 2. Cria a nova planilha unificada
-    sucesso = juntar_planilhas()
+    sucesso = juntar_planilhas(pasta_prontas, caminho_unificado)
     
     if sucesso:
         print("Processo de unificação concluído.")
     else:
         print("Processo de unificação concluído (nenhuma planilha nova para juntar).")
+    return sucesso
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+from collections import namedtuple
+from PIL import Image
+
+# O Tesseract é opcional: sem ele, o processador envia sempre a imagem para a IA.
+# Instalação: 'py -m pip install pytesseract' + o programa Tesseract com o idioma 'por'.
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+# Uma linha de texto lida pelo OCR.
+# 'caixa' = (x, y, largura, altura) em pixels; 'confianca' de 0 a 100.
+LinhaOCR = namedtuple("LinhaOCR", ["texto", "caixa", "confianca"])
+
+
+class ResultadoOCR:
+    """Texto lido de uma imagem, linha a linha, com a confiança média do motor."""
+
+    def __init__(self, linhas, largura, altura):
+        self.linhas = linhas
+        self.largura = largura
+        self.altura = altura
+        self.total_palavras = sum(len(l.texto.split()) for l in linhas)
+        if linhas:
+            # Média ponderada pelo número de palavras de cada linha
+            self.confianca_media = sum(l.confianca * len(l.texto.split()) for l in linhas) / max(self.total_palavras, 1)
+        else:
+            self.confianca_media = 0.0
+
+    def texto_com_posicoes(self):
+        """
+        Texto para enviar à IA no lugar da imagem. Cada linha leva a sua caixa
+        (posição e tamanho), para que a IA consiga associar preços e itens que estão
+        lado a lado ou em colunas, e indicar a região de cada item.
+        """
+        cabecalho = (f"(Imagem de {self.largura}x{self.altura} pixels. "
+                     "Formato: [x=esquerda, y=topo, l=largura, a=altura] texto)")
+        linhas = [f"[x={l.caixa[0]}, y={l.caixa[1]}, l={l.caixa[2]}, a={l.caixa[3]}] {l.texto}" for l in self.linhas]
+        return "\n".join([cabecalho] + linhas)
+
+
+class MotorOCR:
+    """Interface dos motores de OCR local. Para adicionar um motor, implemente 'ler'."""
+
+    nome = ""
+
+    def ler(self, filepath):
+        """Lê a imagem e retorna um ResultadoOCR."""
+        raise NotImplementedError
+
+
+class MotorTesseract(MotorOCR):
+    """OCR com o Tesseract (via pytesseract)."""
+
+    nome = "tesseract"
+
+    def __init__(self, idioma="por"):
+        self.idioma = idioma
+
+    def ler(self, filepath):
+        with Image.open(filepath) as img:
+            img = img.convert("L") # Tons de cinzento: mais rápido e, em geral, mais preciso
+            dados = pytesseract.image_to_data(img, lang=self.idioma, output_type=pytesseract.Output.DICT)
+            largura, altura = img.size
+
+        # O Tesseract devolve palavra a palavra; juntamos as palavras da mesma linha
+        linhas = {}
+        for i, palavra in enumerate(dados["text"]):
+            confianca = float(dados["conf"][i])
+            if not palavra.strip() or confianca < 0:
+                continue
+            chave = (dados["block_num"][i], dados["par_num"][i], dados["line_num"][i])
+            linhas.setdefault(chave, []).append(i)
+
+        resultado = []
+        for indices in linhas.values():
+            esquerda = min(dados["left"][i] for i in indices)
+            topo = min(dados["top"][i] for i in indices)
+            direita = max(dados["left"][i] + dados["width"][i] for i in indices)
+            baixo = max(dados["top"][i] + dados["height"][i] for i in indices)
+            resultado.append(LinhaOCR(
+                texto=" ".join(dados["text"][i] for i in indices),
+                caixa=(esquerda, topo, direita - esquerda, baixo - topo),
+                confianca=sum(float(dados["conf"][i]) for i in indices) / len(indices),
+            ))
+
+        # Ordem de leitura: de cima para baixo, da esquerda para a direita
+        resultado.sort(key=lambda l: (l.caixa[1], l.caixa[0]))
+        return ResultadoOCR(resultado, largura, altura)
+
+
+MOTORES = {
+    MotorTesseract.nome: MotorTesseract,
+}
+
+
+def criar_motor(nome):
+    """
+    Cria o motor de OCR configurado. Retorna None se o OCR estiver desligado
+    (nome vazio), se o nome for desconhecido ou se a biblioteca do motor não
+    estiver instalada: sem OCR local, a imagem vai direto para a IA.
+    """
+    nome = (nome or "").strip().lower()
+    if not nome:
+        return None
+    if nome not in MOTORES:
+        print(f"  Aviso: Motor de OCR '{nome}' desconhecido (opções: {', '.join(MOTORES)}). OCR local desligado.")
+        return None
+    if nome == MotorTesseract.nome and pytesseract is None:
+        print("  Aviso: 'pytesseract' não está instalado. OCR local desligado (a imagem vai direto para a IA).")
+        return None
+    return MOTORES[nome]()
@@ -0,0 +1,37 @@
+# Conversão dos preços das planilhas para o formato do painel.
+import re
+
+
+def preco_em_centavos(valor):
+    """
+    Converte o preço da planilha em centavos (como texto), que é o que a
+    máscara do campo 'valor' do painel espera. Ex: 'R$ 12,50' -> '1250'.
+    Aceita vírgula ou ponto como separador decimal ('12.50' -> '1250') e pontos
+    de milhar ('1.250,00' -> '125000'). Levanta ValueError se o valor não tiver
+    exatamente um número (ex: vazio, 'abc' ou 'P: 20,00 / G: 30,00').
+    """
+    # Valores numéricos (o Excel pode guardar 12.5 em vez de 'R$ 12,50')
+    if isinstance(valor, (int, float)):
+        return str(int(round(valor * 100))) # NaN levanta ValueError
+
+    numeros = re.findall(r"\d[\d.,]*", str(valor))
+    if len(numeros) != 1:
+        raise ValueError(f"Preço inválido: '{valor}'.")
+    numero = numeros[0].rstrip(".,")
+
+    if "," in numero:
+        # Vírgula: é o separador decimal e os pontos são de milhar
+        if numero.count(",") > 1:
+            raise ValueError(f"Preço inválido: '{valor}'.")
+        inteiro, decimal = numero.split(",")
+        inteiro = inteiro.replace(".", "")
+    else:
+        # Só pontos: um ponto seguido de 1 ou 2 dígitos no fim é o separador decimal
+        decimal_com_ponto = re.fullmatch(r"(.*)\.(\d{1,2})", numero)
+        if decimal_com_ponto:
+            inteiro, decimal = decimal_com_ponto.group(1).replace(".", ""), decimal_com_ponto.group(2)
+        else:
+            inteiro, decimal = numero.replace(".", ""), ""
+
+    # round() evita que 12.29 * 100 vire 1228
+    return str(int(round(float(f"{inteiro or 0}.{decimal or 0}") * 100)))
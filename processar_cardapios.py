@@ -1,14 +1,25 @@
 import os
+import io
 import glob
+import math
 import base64
+import hashlib
 import json
 import time
+import unicodedata
+import tempfile
+import uuid
 import requests 
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import xlsxwriter 
 from dotenv import load_dotenv
 from PIL import Image 
 import juntar_planilhas
+import ocr_local
+import indice_imagens
+from progresso import Progresso, cancelamento_solicitado
+from precos import preco_em_centavos
 import sys # Nova importação para sair do script em caso de erro
 
 # Carrega as variáveis de ambiente (do seu .env)
@@ -20,11 +31,39 @@ PASTA_DE_ENTRADA = "menus_para_processar"
 PASTA_DE_SAIDA = "planilhas_prontas"
 PASTA_PROCESSADOS = "menus_arquivados"
 FICHEIRO_CATEGORIAS = "categorias.json" # Nova configuração
+PASTA_CACHE = "cache_extracoes" # Resultados da IA já obtidos, por imagem
+# OCR local (opcional): "tesseract" para ler o texto da imagem antes da IA. Vazio = desligado
+OCR_LOCAL = os.getenv("OCR_LOCAL", "")
+# Confiança média mínima do OCR (0 a 100) para enviar só o texto à IA, em vez da imagem
+OCR_CONFIANCA_MINIMA = float(os.getenv("OCR_CONFIANCA_MINIMA", "80"))
+# Com menos palavras do que isto, o OCR provavelmente falhou (ex: foto escura)
+OCR_MINIMO_PALAVRAS = 5
+# Deteção de imagens repetidas: quantos bits (de 64) o hash perceptual pode diferir
+# para duas imagens contarem como o mesmo cardápio. -1 = desligado
+DISTANCIA_DUPLICADO = int(os.getenv("DISTANCIA_DUPLICADO", "5"))
+# Revisão de itens: os itens com confiança (0 a 100, dada pela IA) abaixo disto, ou com
+# preço implausível, são extraídos de novo a partir de um recorte da imagem. -1 = desligado
+REVISAO_CONFIANCA_MINIMA = float(os.getenv("REVISAO_CONFIANCA_MINIMA", "60"))
+# Preço máximo plausível de um item, em reais (acima disto, o preço é revisto)
+PRECO_MAXIMO = float(os.getenv("PRECO_MAXIMO", "1000"))
+MAX_RECORTES_REVISAO = 6 # Chamadas extra à IA por imagem, no máximo
+MARGEM_RECORTE = 30 # Margem à volta de cada item, na escala 0-1000 da imagem
+LADO_MINIMO_RECORTE = 768 # Recortes menores do que isto (em pixels) são ampliados
 # ---------------------
 
+# Resultados de 'processar_imagem'
+PROCESSADA = "processada"
+DUPLICADA = "duplicada"
+FALHOU = "falhou"
+
 # O modelo Gemini que entende imagens
 MODELO_API = "gemini-2.5-flash-preview-09-2025"
-URL_API = f"https://generativelanguage.googleapis.com/v1beta/models/{MODELO_API}:generateContent?key={API_KEY}"
+URL_API = f"https://generativelanguage.googleapis.com/v1beta/models/{MODELO_API}:generateContent"
+
+# Uma única sessão HTTP para todo o processo: as ligações à API são
+# reaproveitadas entre imagens (e entre clientes, no modo em lote).
+SESSAO_HTTP = requests.Session()
+SESSAO_HTTP.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
 # O "molde" que vamos forçar a IA a usar
 SCHEMA_JSON = {
@@ -35,40 +74,35 @@ SCHEMA_JSON = {
             "Nome": {"type": "STRING"},
             "Valor": {"type": "STRING"},
             "Categoria": {"type": "STRING"},
-            "Descrição": {"type": "STRING"} 
+            "Descrição": {"type": "STRING"},
+            # Certeza da IA sobre o item (0 a 100) e a sua caixa na imagem:
+            # [y_min, x_min, y_max, x_max], de 0 a 1000. Não vão para a planilha.
+            "Confiança": {"type": "NUMBER"},
+            "Região": {"type": "ARRAY", "items": {"type": "INTEGER"}}
         },
-        "required": ["Nome", "Valor", "Categoria", "Descrição"]
+        "required": ["Nome", "Valor", "Categoria", "Descrição", "Confiança"]
     }
 }
 
 
 # --- NOVA FUNÇÃO ---
-def carregar_categorias():
+def carregar_categorias(ficheiro_categorias=FICHEIRO_CATEGORIAS):
     """Lê o ficheiro .json de categorias e retorna uma lista."""
     try:
-        with open(FICHEIRO_CATEGORIAS, 'r', encoding='utf-8') as f:
+        with open(ficheiro_categorias, 'r', encoding='utf-8') as f:
             categorias = json.load(f)
-        if not isinstance(categorias, list) or not all(isinstance(c, str) for c in categorias):
-            raise ValueError("Ficheiro de categorias deve ser uma lista de strings.")
-        print(f"Sucesso: {len(categorias)} categorias carregadas de '{FICHEIRO_CATEGORIAS}'.")
-        return categorias
     except FileNotFoundError:
-        print(f"!!! ERRO FATAL: Ficheiro '{FICHEIRO_CATEGORIAS}' não encontrado.")
-        print("    Por favor, crie o ficheiro com a sua lista de categorias.")
-        sys.exit(1) # Para o script
+        raise ValueError(f"Ficheiro '{ficheiro_categorias}' não encontrado. "
+                         "Por favor, crie o ficheiro com a sua lista de categorias.")
     except json.JSONDecodeError:
-        print(f"!!! ERRO FATAL: Ficheiro '{FICHEIRO_CATEGORIAS}' contém um JSON inválido.")
-        sys.exit(1)
-    except ValueError as e:
-        print(f"!!! ERRO FATAL: {e}")
-        sys.exit(1)
+        raise ValueError(f"Ficheiro '{ficheiro_categorias}' contém um JSON inválido.")
+    if not isinstance(categorias, list) or not all(isinstance(c, str) for c in categorias):
+        raise ValueError("Ficheiro de categorias deve ser uma lista de strings.")
+    print(f"Sucesso: {len(categorias)} categorias carregadas de '{ficheiro_categorias}'.")
+    return categorias
 # --- FIM DA NOVA FUNÇÃO ---
 
 
-# Carrega as categorias UMA VEZ no início
-CATEGORIAS_PERMITIDAS = carregar_categorias()
-
-
 # 1. Função para converter imagem em base64 (sem alterações)
 def image_to_base64(filepath):
     """Converte um arquivo de imagem em uma string base64."""
@@ -85,17 +119,20 @@ def image_to_base64(filepath):
         return None
 
 # 2. Função para chamar a API Gemini (com o prompt mais recente)
-def extrair_dados_do_cardapio(base64_image, mime_type):
+def extrair_dados_do_cardapio(base64_image, mime_type, categorias, api_key=None, texto_ocr=None, recorte=False):
     """
     Envia a imagem para a API Gemini e pede para ela extrair os dados
     usando o nosso molde (SCHEMA_JSON).
+    'api_key' permite usar outra chave (ex: a de um cliente); por padrão, a do .env.
+    Se 'texto_ocr' for indicado, envia esse texto (lido pelo OCR local) no lugar da imagem.
+    'recorte=True' avisa a IA de que a imagem é só uma parte do cardápio (revisão de itens).
     """
     headers = {"Content-Type": "application/json"}
     
     # --- PROMPT REFINADO (GENERALISTA, PRECISO E COM AUTO-CORREÇÃO) ---
     
     # Formata a lista de categorias vinda do ficheiro .json
-    lista_categorias_formatada = ", ".join([f"'{c}'" for c in CATEGORIAS_PERMITIDAS])
+    lista_categorias_formatada = ", ".join([f"'{c}'" for c in categorias])
     
     prompt = (
         "Você é um assistente especialista em extração de dados de imagens. "
@@ -139,22 +176,50 @@ def extrair_dados_do_cardapio(base64_image, mime_type):
         "   - Use o contexto da imagem (como a descrição ou outros itens) para deduzir e corrigir a palavra (ex: 'Árabe', 'Calabresa', 'Sobrancelha')."
         "   - Verifique a plausibilidade. O seu conhecimento da língua portuguesa é crucial para corrigir erros de OCR."
 
+        "--- CONFIANÇA E LOCALIZAÇÃO DE CADA ITEM ---"
+        "1. [Confiança]: De 0 a 100, o quanto você tem certeza de que o Nome e o Valor do item estão corretos. "
+        "   Use valores baixos quando o texto estiver borrado, pequeno ou cortado, ou quando a associação do preço for duvidosa. "
+        "   Seja honesto: os itens com confiança baixa serão revistos."
+        "2. [Região]: A caixa do item na imagem, no formato [y_min, x_min, y_max, x_max], com coordenadas normalizadas de 0 a 1000. "
+        "   A caixa deve cobrir o nome, a descrição e o preço do item."
+
         "--- SAÍDA ---"
         "Retorne TODOS os itens encontrados, seguindo TODAS as regras acima (visuais, de expansão, "
         "formatação, classificação e precisão), no formato JSON solicitado."
     )
     # --- FIM DO PROMPT REFINADO ---
+
+    if texto_ocr:
+        # Modo texto: a IA só estrutura o que o OCR local já leu (muito menos dados a enviar)
+        prompt += (
+            "--- ENTRADA EM TEXTO ---"
+            "Em vez da imagem, você vai receber o texto já lido por OCR, linha a linha, com a caixa "
+            "de cada linha na imagem original (x, y do canto superior esquerdo, largura l e altura a). "
+            "Trate-o como se fosse a imagem: use as posições e tamanhos "
+            "para reconstruir o layout (colunas, preços à direita, títulos de seção) e aplique todas as regras acima. "
+            "Para a 'Região', junte as caixas das linhas do item e converta-as para a escala de 0 a 1000 com o tamanho da imagem indicado no início do texto."
+        )
+        conteudo = {"text": texto_ocr}
+    else:
+        if recorte:
+            prompt += (
+                "--- RECORTE PARA REVISÃO ---"
+                "Esta imagem é um recorte ampliado de uma parte do cardápio, enviado para revisão. "
+                "Extraia apenas os itens cujo nome e preço estejam completamente visíveis; ignore os itens cortados nas bordas. "
+                "Leia os preços com o máximo cuidado."
+            )
+        conteudo = {
+            "inlineData": {
+                "mimeType": mime_type,
+                "data": base64_image
+            }
+        }
     
     payload = {
         "contents": [{
             "parts": [
                 {"text": prompt},
-                {
-                    "inlineData": {
-                        "mimeType": mime_type,
-                        "data": base64_image
-                    }
-                }
+                conteudo
             ]
         }],
         "generationConfig": {
@@ -166,7 +231,7 @@ def extrair_dados_do_cardapio(base64_image, mime_type):
     # Implementa retry com exponential backoff (sem alterações)
     for i in range(5): 
         try:
-            response = requests.post(URL_API, headers=headers, data=json.dumps(payload), timeout=30)
+            response = SESSAO_HTTP.post(URL_API, params={"key": api_key or API_KEY}, headers=headers, data=json.dumps(payload), timeout=30)
             
             if response.status_code == 200:
                 response_json = response.json()
@@ -193,6 +258,234 @@ def extrair_dados_do_cardapio(base64_image, mime_type):
     print("  Falha ao extrair dados após várias tentativas.")
     return None
 
+# --- OCR LOCAL ---
+MOTOR_OCR = ocr_local.criar_motor(OCR_LOCAL)
+
+
+def extrair_dados(filepath, base64_image, mime_type, categorias, api_key=None):
+    """
+    Escolhe como extrair: se o OCR local leu a imagem com confiança suficiente,
+    envia só o texto à IA (mais barato e mais rápido). Senão, envia a imagem.
+    """
+    if MOTOR_OCR is not None:
+        try:
+            resultado = MOTOR_OCR.ler(filepath)
+            print(f"  OCR local: {resultado.total_palavras} palavras, confiança média {resultado.confianca_media:.0f}.")
+            if resultado.confianca_media >= OCR_CONFIANCA_MINIMA and resultado.total_palavras >= OCR_MINIMO_PALAVRAS:
+                print("  Confiança alta: enviando só o texto à IA.")
+                dados = extrair_dados_do_cardapio(None, mime_type, categorias, api_key=api_key,
+                                                  texto_ocr=resultado.texto_com_posicoes())
+                if dados:
+                    return dados
+                print("  O modo texto não devolveu itens. Tentando com a imagem...")
+        except Exception as e:
+            print(f"  Aviso: Falha no OCR local ({e}). Usando a imagem.")
+
+    return extrair_dados_do_cardapio(base64_image, mime_type, categorias, api_key=api_key)
+# --- FIM DO OCR LOCAL ---
+
+
+# --- REVISÃO DE ITENS ---
+def preco_plausivel(valor):
+    """O preço pode ser lido (ex: 'R$ 12,50') e está entre R$ 0,01 e PRECO_MAXIMO?"""
+    try:
+        centavos = int(preco_em_centavos(valor))
+    except (ValueError, TypeError):
+        return False
+    return 0 < centavos <= PRECO_MAXIMO * 100
+
+
+def _confianca(item):
+    try:
+        return float(item.get("Confiança"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _regiao(item):
+    """Caixa do item (y_min, x_min, y_max, x_max) na escala 0-1000, ou None se inválida."""
+    regiao = item.get("Região")
+    if not isinstance(regiao, list) or len(regiao) != 4:
+        return None
+    try:
+        y0, x0, y1, x1 = (min(max(float(v), 0), 1000) for v in regiao)
+    except (TypeError, ValueError):
+        return None
+    if y1 <= y0 or x1 <= x0:
+        return None
+    return (y0, x0, y1, x1)
+
+
+def itens_suspeitos(dados):
+    """Índices dos itens com confiança baixa ou preço implausível."""
+    suspeitos = []
+    for i, item in enumerate(dados):
+        confianca = _confianca(item)
+        if (confianca is not None and confianca < REVISAO_CONFIANCA_MINIMA) or not preco_plausivel(item.get("Valor", "")):
+            suspeitos.append(i)
+    return suspeitos
+
+
+def agrupar_regioes(dados, indices):
+    """
+    Junta numa só caixa os itens suspeitos cujas regiões (com margem) se sobrepõem,
+    para que itens vizinhos sejam revistos no mesmo recorte.
+    Retorna ([(caixa, [índices])], índices sem região).
+    """
+    caixas, sem_regiao = [], []
+    for i in indices:
+        regiao = _regiao(dados[i])
+        if regiao is None:
+            sem_regiao.append(i)
+            continue
+        y0, x0, y1, x1 = regiao
+        caixas.append(([max(y0 - MARGEM_RECORTE, 0), max(x0 - MARGEM_RECORTE, 0),
+                        min(y1 + MARGEM_RECORTE, 1000), min(x1 + MARGEM_RECORTE, 1000)], [i]))
+
+    # Junta pares que se sobrepõem até não haver mais nenhum: uma caixa que cresceu
+    # pode passar a sobrepor outra já vista, e a mesma zona não pode ir duas vezes à API
+    grupos = sorted(caixas, key=lambda c: (c[0][0], c[0][1]))
+    juntou = True
+    while juntou:
+        juntou = False
+        for a in range(len(grupos)):
+            for b in range(a + 1, len(grupos)):
+                caixa_a, caixa_b = grupos[a][0], grupos[b][0]
+                if caixa_b[0] < caixa_a[2] and caixa_a[0] < caixa_b[2] and caixa_b[1] < caixa_a[3] and caixa_a[1] < caixa_b[3]:
+                    caixa_a[:] = [min(caixa_a[0], caixa_b[0]), min(caixa_a[1], caixa_b[1]),
+                                  max(caixa_a[2], caixa_b[2]), max(caixa_a[3], caixa_b[3])]
+                    grupos[a][1].extend(grupos.pop(b)[1])
+                    juntou = True
+                    break
+            if juntou:
+                break
+    return grupos, sem_regiao
+
+
+def recortar_imagem(filepath, caixa):
+    """Recorta a caixa (escala 0-1000) da imagem e retorna-a em base64 (PNG), ampliada se for pequena."""
+    with Image.open(filepath) as img:
+        img = img.convert("RGB")
+        largura, altura = img.size
+        y0, x0, y1, x1 = caixa
+        recorte = img.crop((int(x0 * largura / 1000), int(y0 * altura / 1000),
+                            math.ceil(x1 * largura / 1000), math.ceil(y1 * altura / 1000)))
+    # Texto pequeno lê-se melhor ampliado (até 3x)
+    escala = min(LADO_MINIMO_RECORTE / max(recorte.size), 3)
+    if escala > 1:
+        recorte = recorte.resize((round(recorte.width * escala), round(recorte.height * escala)), Image.LANCZOS)
+    buffer = io.BytesIO()
+    recorte.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def _normalizar_nome(texto):
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+
+def _correspondente(item, candidatos, usados):
+    """
+    O item do recorte com exatamente o mesmo nome (sem acentos nem maiúsculas)
+    ainda não usado, ou None. Nomes só parecidos não contam: 'Pizza Calabresa P'
+    e 'Pizza Calabresa M' são variações diferentes do mesmo item.
+    """
+    nome = _normalizar_nome(item.get("Nome", ""))
+    for j, candidato in enumerate(candidatos):
+        if j not in usados and _normalizar_nome(candidato.get("Nome", "")) == nome:
+            return j
+    return None
+
+
+def revisar_itens(filepath, dados, categorias, api_key=None):
+    """
+    Extrai de novo, a partir de recortes da imagem, só os itens com confiança baixa
+    ou preço implausível, e troca-os pela nova leitura quando esta é melhor.
+    Os outros itens ficam como estão. Retorna a lista (corrigida) de itens.
+    """
+    if REVISAO_CONFIANCA_MINIMA < 0 or not isinstance(dados, list):
+        return dados
+
+    suspeitos = itens_suspeitos(dados)
+    if not suspeitos:
+        return dados
+
+    grupos, sem_regiao = agrupar_regioes(dados, suspeitos)
+    print(f"  Revisão: {len(suspeitos)} de {len(dados)} itens com confiança baixa ou preço implausível "
+          f"({len(grupos)} recortes).")
+    if sem_regiao:
+        print(f"  Aviso: {len(sem_regiao)} itens sem região válida não podem ser revistos.")
+    if len(grupos) > MAX_RECORTES_REVISAO:
+        # Primeiro os recortes com os itens menos confiáveis
+        grupos.sort(key=lambda g: min(_confianca(dados[i]) or 0 for i in g[1]))
+        print(f"  Aviso: Só os {MAX_RECORTES_REVISAO} recortes mais duvidosos serão revistos.")
+        grupos = grupos[:MAX_RECORTES_REVISAO]
+
+    dados = list(dados)
+    corrigidos = 0
+    for caixa, indices in grupos:
+        try:
+            b64_recorte = recortar_imagem(filepath, caixa)
+        except Exception as e:
+            print(f"  Aviso: Não foi possível recortar a imagem ({e}).")
+            continue
+        novos = extrair_dados_do_cardapio(b64_recorte, "image/png", categorias, api_key=api_key, recorte=True)
+        if not isinstance(novos, list):
+            continue
+
+        usados = set()
+        for i in indices:
+            j = _correspondente(dados[i], novos, usados)
+            if j is None:
+                continue
+            usados.add(j) # Cada item do recorte só é comparado com um item original
+            antigo, novo = dados[i], novos[j]
+            if not preco_plausivel(novo.get("Valor", "")):
+                continue
+            confianca_antiga, confianca_nova = _confianca(antigo) or 0, _confianca(novo) or 0
+            if preco_plausivel(antigo.get("Valor", "")) and confianca_nova <= confianca_antiga:
+                continue
+            # O nome, a categoria e a região ficam os da imagem inteira
+            # (o recorte pode não mostrar o título da seção)
+            corrigido = dict(antigo)
+            for campo in ("Valor", "Descrição", "Confiança"):
+                if campo in novo:
+                    corrigido[campo] = novo[campo]
+            dados[i] = corrigido
+            corrigidos += 1
+
+    print(f"  Revisão concluída: {corrigidos} itens corrigidos.")
+    return dados
+# --- FIM DA REVISÃO DE ITENS ---
+
+
+# --- CACHE DE EXTRAÇÕES ---
+def chave_cache(base64_image, categorias):
+    """Identifica uma extração: a mesma imagem, com as mesmas categorias e o mesmo modelo."""
+    conteudo = "\n".join([MODELO_API, *categorias, base64_image])
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def ler_cache(chave):
+    """Retorna os dados já extraídos para esta chave, ou None."""
+    caminho = os.path.join(PASTA_CACHE, f"{chave}.json")
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def gravar_cache(chave, dados):
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    caminho = os.path.join(PASTA_CACHE, f"{chave}.json")
+    # Ficheiro temporário único: vários threads podem gravar a mesma chave ao mesmo tempo
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=PASTA_CACHE, suffix=".tmp", delete=False) as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(f.name, caminho)
+# --- FIM DO CACHE ---
+
 # 3. Função para salvar os dados em um Excel formatado (sem alterações)
 def salvar_excel_formatado(dados_json, output_filepath):
     """Salva a lista de dados em um .xlsx formatado."""
@@ -235,17 +528,112 @@ def salvar_excel_formatado(dados_json, output_filepath):
     writer.close()
     print(f"  Sucesso! Planilha formatada salva em: {output_filepath}")
 
-# 4. Função Principal (com a chamada do 'juntar_planilhas')
+# 4. Processa uma única imagem (usado pelo 'main' e pelo modo em lote)
+def processar_imagem(filepath, categorias, pasta_saida=PASTA_DE_SAIDA, pasta_processados=PASTA_PROCESSADOS, api_key=None):
+    """
+    Extrai os dados de uma imagem, salva a planilha e arquiva a imagem.
+    Retorna PROCESSADA, DUPLICADA (igual a uma imagem já arquivada, não foi
+    extraída de novo) ou FALHOU.
+    """
+    filename = os.path.basename(filepath)
+    print(f"\nProcessando: {filename}...")
+    
+    mime_type = "image/png" if filename.lower().endswith(".png") else "image/jpeg"
+    
+    b64_image = image_to_base64(filepath)
+    if not b64_image:
+        try:
+            os.rename(filepath, os.path.join(pasta_processados, f"CORROMPIDO_{filename}"))
+            print(f"  Ficheiro corrompido movido para '{pasta_processados}'.")
+        except Exception as e:
+            print(f"  Erro ao mover ficheiro corrompido: {e}")
+        return FALHOU
+
+    # O mesmo cardápio já foi processado (outro screenshot, foto recomprimida...)?
+    indice = None
+    id_entrada = None
+    if DISTANCIA_DUPLICADO >= 0:
+        indice = indice_imagens.obter_indice(pasta_processados)
+        id_entrada, encontrado = indice.verificar_e_registrar(filename, indice_imagens.dhash(filepath), DISTANCIA_DUPLICADO)
+        if encontrado is not None:
+            original, distancia = encontrado
+            print(f"  Imagem repetida: igual a '{original['ficheiro']}' (diferença de {distancia} bits). Extração ignorada.")
+            nome_duplicado = indice_imagens.nome_no_arquivo(pasta_processados, f"DUPLICADO_{filename}", id_entrada[:8])
+            try:
+                os.rename(filepath, os.path.join(pasta_processados, nome_duplicado))
+                indice.atualizar(id_entrada, ficheiro=nome_duplicado)
+                print(f"  Ficheiro movido para '{pasta_processados}' como '{nome_duplicado}'.")
+            except Exception as e:
+                print(f"  Erro ao mover ficheiro repetido: {e}")
+            return DUPLICADA
+
+    # Outra imagem com o mesmo nome já arquivada não é substituída
+    nome_arquivado = indice_imagens.nome_no_arquivo(pasta_processados, filename, (id_entrada or uuid.uuid4().hex)[:8])
+
+    # A partir daqui a imagem está no índice como original: se não terminar como
+    # PROCESSADA (falha, exceção, ficheiro aberto no Excel...), sai do índice e fica
+    # na entrada para ser tentada de novo, em vez de virar duplicado de si mesma
+    resultado = FALHOU
+    try:
+        # A mesma imagem (com as mesmas categorias) já foi extraída antes? Não pagamos a API de novo.
+        chave = chave_cache(b64_image, categorias)
+        dados = ler_cache(chave)
+        if dados:
+            print("  Resultado reaproveitado do cache (sem chamar a API).")
+        else:
+            dados = extrair_dados(filepath, b64_image, mime_type, categorias, api_key=api_key)
+            if not dados:
+                print("  Não foi possível extrair dados.")
+                return FALHOU
+            # Só os itens duvidosos voltam à IA, e o cache guarda o resultado já revisto
+            dados = revisar_itens(filepath, dados, categorias, api_key=api_key)
+            gravar_cache(chave, dados)
+
+        output_filename = os.path.splitext(filename)[0] + ".xlsx"
+        output_filepath = os.path.join(pasta_saida, output_filename)
+        salvar_excel_formatado(dados, output_filepath)
+
+        try:
+            os.rename(filepath, os.path.join(pasta_processados, nome_arquivado))
+        except Exception as e:
+            print(f"  Erro ao mover ficheiro original: {e}")
+            return FALHOU
+        print(f"  Ficheiro original movido para '{pasta_processados}'" +
+              (f" como '{nome_arquivado}'." if nome_arquivado != filename else "."))
+        resultado = PROCESSADA
+        return PROCESSADA
+    finally:
+        if indice is not None:
+            if resultado == PROCESSADA:
+                indice.concluir(id_entrada, ficheiro=nome_arquivado, chave_cache=chave)
+            else:
+                indice.remover(id_entrada)
+
+
+def listar_imagens(pasta_entrada):
+    """Lista as imagens (.png, .jpg, .jpeg) de uma pasta."""
+    arquivos = glob.glob(os.path.join(pasta_entrada, "*.png"))
+    arquivos.extend(glob.glob(os.path.join(pasta_entrada, "*.jpg")))
+    arquivos.extend(glob.glob(os.path.join(pasta_entrada, "*.jpeg"))) 
+    return arquivos
+
+
+# 5. Função Principal (com a chamada do 'juntar_planilhas')
 def main():
     print("Iniciando Robô Processador de Cardápios (Etapa 1)...")
+
+    # Carrega as categorias UMA VEZ no início
+    try:
+        categorias = carregar_categorias()
+    except ValueError as e:
+        print(f"!!! ERRO FATAL: {e}")
+        sys.exit(1) # Para o script
     
     os.makedirs(PASTA_DE_ENTRADA, exist_ok=True)
     os.makedirs(PASTA_DE_SAIDA, exist_ok=True)
     os.makedirs(PASTA_PROCESSADOS, exist_ok=True)
     
-    arquivos = glob.glob(os.path.join(PASTA_DE_ENTRADA, "*.png"))
-    arquivos.extend(glob.glob(os.path.join(PASTA_DE_ENTRADA, "*.jpg")))
-    arquivos.extend(glob.glob(os.path.join(PASTA_DE_ENTRADA, "*.jpeg"))) 
+    arquivos = listar_imagens(PASTA_DE_ENTRADA)
     
     if not arquivos:
         print(f"Nenhum ficheiro .png, .jpg ou .jpeg encontrado em '{PASTA_DE_ENTRADA}'.")
@@ -255,37 +643,22 @@ def main():
     print(f"Encontrados {len(arquivos)} cardápios para processar...")
     
     arquivos_processados_com_sucesso = 0
+    progresso = Progresso(len(arquivos), etapa="Extração")
     
     for filepath in arquivos:
-        filename = os.path.basename(filepath)
-        print(f"\nProcessando: {filename}...")
-        
-        mime_type = "image/png" if filename.lower().endswith(".png") else "image/jpeg"
-        
-        b64_image = image_to_base64(filepath)
-        if not b64_image:
-            try:
-                os.rename(filepath, os.path.join(PASTA_PROCESSADOS, f"CORROMPIDO_{filename}"))
-                print(f"  Ficheiro corrompido movido para '{PASTA_PROCESSADOS}'.")
-            except Exception as e:
-                print(f"  Erro ao mover ficheiro corrompido: {e}")
-            continue
-            
-        dados = extrair_dados_do_cardapio(b64_image, mime_type)
-        if not dados:
-            print("  Não foi possível extrair dados.")
-            continue
-            
-        output_filename = os.path.splitext(filename)[0] + ".xlsx"
-        output_filepath = os.path.join(PASTA_DE_SAIDA, output_filename)
-        salvar_excel_formatado(dados, output_filepath)
-        
+        # Cancelamento pedido pela interface: para entre duas imagens
+        if cancelamento_solicitado():
+            print("\nCancelamento solicitado. As imagens restantes ficam para a próxima execução.")
+            break
+
         try:
-            os.rename(filepath, os.path.join(PASTA_PROCESSADOS, filename))
-            print(f"  Ficheiro original movido para '{PASTA_PROCESSADOS}'.")
-            arquivos_processados_com_sucesso += 1
+            resultado = processar_imagem(filepath, categorias)
         except Exception as e:
-            print(f"  Erro ao mover ficheiro original: {e}")
+            print(f"  Erro ao processar '{os.path.basename(filepath)}': {e}")
+            resultado = FALHOU
+        if resultado == PROCESSADA:
+            arquivos_processados_com_sucesso += 1
+        progresso.avancar(falhou=(resultado == FALHOU))
 
     print("\nProcessamento (Etapa 1) concluído!")
     
@@ -306,4 +679,4 @@ def main():
 
 # Roda a função principal
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import dotenv_values
+import processar_cardapios
+import juntar_planilhas
+from progresso import ler_progresso
+
+# --- CONFIGURAÇÕES ---
+# Manifesto com a lista de clientes (ver 'clientes.json.example')
+FICHEIRO_MANIFESTO = "clientes.json"
+# Limites globais (podem ser alterados no manifesto)
+MAX_EXTRACOES_SIMULTANEAS = 4 # Chamadas à IA em paralelo, somando todos os clientes
+MAX_NAVEGADORES_SIMULTANEOS = 2 # Navegadores abertos ao mesmo tempo
+# ---------------------
+
+# Credenciais do painel que o .env de cada cliente TEM de ter. Não há valor padrão:
+# sem elas, os produtos do cliente iriam para a conta do .env do projeto.
+CREDENCIAIS_OBRIGATORIAS = ("USUARIO", "SENHA", "LOGIN", "CADASTRO")
+
+# Garante que as linhas de clientes diferentes não se misturam no terminal
+LOCK_TERMINAL = threading.RLock()
+# Cliente da imagem que o thread atual está a extrair (ver SaidaPorCliente)
+CLIENTE_DO_THREAD = threading.local()
+
+
+def registrar(cliente, mensagem):
+    with LOCK_TERMINAL:
+        print(f"[{cliente['nome']}] {mensagem}", flush=True)
+
+
+class SaidaPorCliente:
+    """
+    Substitui o sys.stdout para que cada linha impressa por processar_cardapios
+    nos threads de extração (partilhados entre clientes) leve o nome do cliente.
+    """
+
+    def __init__(self, saida):
+        self.saida = saida
+
+    def write(self, texto):
+        nome = getattr(CLIENTE_DO_THREAD, "nome", None)
+        if nome is None:
+            return self.saida.write(texto)
+        # Junta o texto até ao fim da linha, para pôr o prefixo uma só vez por linha
+        pendente = getattr(CLIENTE_DO_THREAD, "pendente", "") + texto
+        *linhas, CLIENTE_DO_THREAD.pendente = pendente.split("\n")
+        with LOCK_TERMINAL:
+            for linha in linhas:
+                self.saida.write(f"[{nome}] {linha}\n")
+        return len(texto)
+
+    def flush(self):
+        self.saida.flush()
+
+    def __getattr__(self, nome):
+        return getattr(self.saida, nome)
+
+
+def extrair_imagem_do_cliente(cliente, *args, **kwargs):
+    """Corre processar_imagem num thread do pool, com os prints marcados com o nome do cliente."""
+    CLIENTE_DO_THREAD.nome = cliente["nome"]
+    try:
+        return processar_cardapios.processar_imagem(*args, **kwargs)
+    finally:
+        resto = getattr(CLIENTE_DO_THREAD, "pendente", "")
+        CLIENTE_DO_THREAD.nome = CLIENTE_DO_THREAD.pendente = None
+        if resto:
+            registrar(cliente, resto)
+
+
+def validar_credenciais(cliente):
+    """
+    Confere que o .env do cliente tem todas as credenciais do painel.
+    Retorna as variáveis do .env; levanta ValueError se faltar alguma.
+    """
+    if not os.path.exists(cliente["env"]):
+        raise ValueError(f"Cliente '{cliente['nome']}': ficheiro '{cliente['env']}' não encontrado.")
+    credenciais = dotenv_values(cliente["env"])
+    faltando = [c for c in CREDENCIAIS_OBRIGATORIAS if not (credenciais.get(c) or "").strip()]
+    if faltando:
+        raise ValueError(f"Cliente '{cliente['nome']}': faltam {', '.join(faltando)} em '{cliente['env']}'.")
+    return credenciais
+
+
+def carregar_manifesto(ficheiro_manifesto=FICHEIRO_MANIFESTO):
+    """
+    Lê o manifesto e completa cada cliente com as pastas padrão.
+    Cada cliente tem a sua própria pasta, com a mesma estrutura do projeto:
+    menus_para_processar, planilhas_prontas, menus_arquivados, planilhas_arquivadas,
+    categorias.json e .env (credenciais do painel).
+    """
+    with open(ficheiro_manifesto, 'r', encoding='utf-8') as f:
+        manifesto = json.load(f)
+
+    clientes = manifesto.get("clientes", [])
+    if not clientes:
+        raise ValueError(f"Nenhum cliente definido em '{ficheiro_manifesto}'.")
+
+    nomes = set()
+    for cliente in clientes:
+        if "nome" not in cliente:
+            raise ValueError("Todos os clientes do manifesto precisam de um 'nome'.")
+        if cliente["nome"] in nomes:
+            raise ValueError(f"Cliente '{cliente['nome']}' repetido no manifesto.")
+        nomes.add(cliente["nome"])
+
+        pasta = cliente.setdefault("pasta", os.path.join("clientes", cliente["nome"]))
+        cliente.setdefault("pasta_entrada", os.path.join(pasta, processar_cardapios.PASTA_DE_ENTRADA))
+        cliente.setdefault("pasta_saida", os.path.join(pasta, processar_cardapios.PASTA_DE_SAIDA))
+        cliente.setdefault("pasta_processados", os.path.join(pasta, processar_cardapios.PASTA_PROCESSADOS))
+        cliente.setdefault("pasta_arquivadas", os.path.join(pasta, juntar_planilhas.PASTA_ARQUIVADAS))
+        cliente.setdefault("arquivo_unificado", os.path.join(pasta, juntar_planilhas.NOME_ARQUIVO_UNIFICADO))
+        cliente.setdefault("categorias", os.path.join(pasta, processar_cardapios.FICHEIRO_CATEGORIAS))
+        cliente.setdefault("env", os.path.join(pasta, ".env"))
+        cliente.setdefault("max_extracoes", 1) # Chamadas à IA em paralelo só deste cliente
+        cliente.setdefault("cadastrar", True)
+
+        # Sem as credenciais do próprio cliente, o lote nem começa
+        if cliente["cadastrar"]:
+            validar_credenciais(cliente)
+
+    return manifesto
+
+
+class ExecutorEmLote:
+    """
+    Corre a extração e o cadastro de vários clientes ao mesmo tempo.
+
+    - Extração: um único 'pool' de threads (e a mesma sessão HTTP e o mesmo
+      cache de processar_cardapios) para todos os clientes, com um limite
+      global e um limite por cliente.
+    - Cadastro: cada cliente abre o seu navegador num subprocesso, com as suas
+      credenciais, até MAX_NAVEGADORES_SIMULTANEOS ao mesmo tempo.
+    """
+
+    def __init__(self, manifesto):
+        self.clientes = manifesto["clientes"]
+        max_extracoes = manifesto.get("max_extracoes_simultaneas", MAX_EXTRACOES_SIMULTANEAS)
+        max_navegadores = manifesto.get("max_navegadores_simultaneos", MAX_NAVEGADORES_SIMULTANEOS)
+        self.pool_extracao = ThreadPoolExecutor(max_workers=max_extracoes, thread_name_prefix="extracao")
+        self.vagas_navegador = threading.BoundedSemaphore(max_navegadores)
+        self.resultados = {}
+
+    def executar(self):
+        """Corre todos os clientes e retorna {nome: resumo}."""
+        threads = []
+        for cliente in self.clientes:
+            thread = threading.Thread(target=self._executar_cliente, args=(cliente,), name=cliente["nome"])
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        self.pool_extracao.shutdown()
+        return self.resultados
+
+    def _executar_cliente(self, cliente):
+        resumo = {"imagens": 0, "extraidas": 0, "repetidas": 0, "falhas": 0, "cadastro": "não executado"}
+        self.resultados[cliente["nome"]] = resumo
+        try:
+            categorias = processar_cardapios.carregar_categorias(cliente["categorias"])
+            credenciais = dotenv_values(cliente["env"]) if os.path.exists(cliente["env"]) else {}
+
+            # 1. Extração (IA)
+            extraidas = self._extrair(cliente, categorias, credenciais, resumo)
+
+            # 2. Unificação das planilhas do cliente
+            if extraidas > 0:
+                registrar(cliente, "Unificando planilhas...")
+                juntar_planilhas.main(cliente["pasta_saida"], cliente["pasta_arquivadas"], cliente["arquivo_unificado"])
+
+            # 3. Cadastro (navegador)
+            if cliente["cadastrar"] and extraidas > 0:
+                resumo["cadastro"] = self._cadastrar(cliente, credenciais)
+            elif cliente["cadastrar"]:
+                registrar(cliente, "Nenhuma planilha nova, cadastro ignorado.")
+
+        except Exception as e:
+            registrar(cliente, f"!!! ERRO: {e}")
+            resumo["cadastro"] = f"erro: {e}"
+
+    def _extrair(self, cliente, categorias, credenciais, resumo):
+        """Envia as imagens do cliente para o pool partilhado, respeitando o limite do cliente."""
+        for pasta in ("pasta_entrada", "pasta_saida", "pasta_processados"):
+            os.makedirs(cliente[pasta], exist_ok=True)
+
+        arquivos = processar_cardapios.listar_imagens(cliente["pasta_entrada"])
+        resumo["imagens"] = len(arquivos)
+        if not arquivos:
+            registrar(cliente, "Nenhuma imagem nova.")
+            return 0
+
+        registrar(cliente, f"{len(arquivos)} imagens para processar.")
+        vagas_cliente = threading.BoundedSemaphore(cliente["max_extracoes"])
+        futuros = []
+        for filepath in arquivos:
+            # Espera uma vaga do cliente ANTES de ocupar um thread do pool partilhado,
+            # para que um cliente grande não bloqueie os outros
+            vagas_cliente.acquire()
+            futuro = self.pool_extracao.submit(
+                extrair_imagem_do_cliente, cliente, filepath, categorias,
+                cliente["pasta_saida"], cliente["pasta_processados"],
+                api_key=credenciais.get("GEMINI_API_KEY")
+            )
+            futuro.add_done_callback(lambda f: vagas_cliente.release())
+            futuros.append(futuro)
+
+        for futuro in futuros:
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                registrar(cliente, f"Erro ao processar imagem: {e}")
+                resultado = processar_cardapios.FALHOU
+            if resultado == processar_cardapios.PROCESSADA:
+                resumo["extraidas"] += 1
+            elif resultado == processar_cardapios.DUPLICADA:
+                resumo["repetidas"] += 1
+            else:
+                resumo["falhas"] += 1
+
+        registrar(cliente, f"Extração concluída: {resumo['extraidas']}/{len(arquivos)} imagens.")
+        return resumo["extraidas"]
+
+    def _cadastrar(self, cliente, credenciais):
+        """Corre o robô de cadastro num subprocesso, com as credenciais e ficheiros do cliente."""
+        # O .env do cliente tem prioridade sobre o .env do projeto (o load_dotenv não sobrescreve).
+        # As credenciais do painel são conferidas de novo: nunca caem nas do projeto.
+        credenciais = validar_credenciais(cliente)
+        env = dict(os.environ)
+        env.update({k: v for k, v in credenciais.items() if v is not None})
+        env["ARQUIVO_EXCEL"] = cliente["arquivo_unificado"]
+        env["ARQUIVO_SESSAO"] = os.path.join(cliente["pasta"], "sessao_painel.json")
+        # Dois navegadores não podem partilhar o mesmo perfil
+        env["PASTA_PERFIL"] = credenciais.get("PASTA_PERFIL") or ""
+        env["PYTHONUNBUFFERED"] = "1"
+        env["PYTHONIOENCODING"] = "utf-8"
+
+        registrar(cliente, "Aguardando um navegador livre...")
+        with self.vagas_navegador:
+            registrar(cliente, "Iniciando cadastro...")
+            process = subprocess.Popen(
+                [sys.executable, "cadastrar_produtos_otimizado.py"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                env=env,
+            )
+            for line in process.stdout:
+                dados = ler_progresso(line)
+                if dados is not None:
+                    if dados["feitos"]:
+                        registrar(cliente, f"Cadastro: {dados['feitos']}/{dados['total']} produtos")
+                elif line.strip():
+                    registrar(cliente, line.rstrip())
+            process.wait()
+
+        # O robô sai com código != 0 se algum produto não foi cadastrado (login, página, erro a meio)
+        if process.returncode == 0:
+            return "concluído"
+        registrar(cliente, f"!!! Cadastro falhou (código {process.returncode}).")
+        return f"falhou (código {process.returncode})"
+
+
+def main():
+    print("Iniciando Modo em Lote (vários clientes)...")
+    ficheiro_manifesto = sys.argv[1] if len(sys.argv) > 1 else FICHEIRO_MANIFESTO
+    try:
+        manifesto = carregar_manifesto(ficheiro_manifesto)
+    except FileNotFoundError:
+        print(f"!!! ERRO FATAL: Manifesto '{ficheiro_manifesto}' não encontrado.")
+        print("    Crie-o a partir do 'clientes.json.example'.")
+        sys.exit(1)
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"!!! ERRO FATAL: Manifesto inválido: {e}")
+        sys.exit(1)
+
+    print(f"{len(manifesto['clientes'])} clientes no manifesto.")
+    sys.stdout = SaidaPorCliente(sys.stdout)
+    resultados = ExecutorEmLote(manifesto).executar()
+
+    print("\n" + "="*30)
+    print("Resumo do lote:")
+    for nome, resumo in resultados.items():
+        print(f"  {nome}: {resumo['extraidas']}/{resumo['imagens']} imagens extraídas, "
+              f"{resumo['repetidas']} repetida(s), {resumo['falhas']} falha(s), cadastro {resumo['cadastro']}")
+
+    # Só é sucesso se nenhum cadastro pedido falhou
+    com_falha = [nome for nome, resumo in resultados.items()
+                 if resumo["cadastro"].startswith(("falhou", "erro"))]
+    if com_falha:
+        print(f"\n!!! Cadastro com falha em {len(com_falha)} cliente(s): {', '.join(com_falha)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
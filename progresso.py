@@ -0,0 +1,63 @@
+import os
+import json
+import time
+
+# --- CANAL DE PROGRESSO ENTRE OS ROBÔS E A INTERFACE ---
+# Os robôs imprimem linhas com este prefixo seguidas de um JSON.
+# A interface (RPA.py) reconhece estas linhas e mostra-as na barra de progresso
+# em vez de as escrever no log. Corridos no terminal, continuam legíveis.
+PREFIXO_PROGRESSO = "@@PROGRESSO "
+
+# A interface define esta variável com o caminho de um ficheiro "bandeira".
+# Quando o ficheiro existe, o robô para no fim do item atual.
+VARIAVEL_CANCELAMENTO = "RPA_ARQUIVO_CANCELAMENTO"
+# --------------------------------------------------------
+
+
+class Progresso:
+    """Conta os itens de um robô e publica o progresso a cada item."""
+
+    def __init__(self, total, etapa=""):
+        self.total = total
+        self.etapa = etapa
+        self.feitos = 0
+        self.falhas = 0
+        self.inicio = time.monotonic()
+        self.publicar()
+
+    def avancar(self, falhou=False):
+        """Marca mais um item como terminado (com ou sem sucesso)."""
+        self.feitos += 1
+        if falhou:
+            self.falhas += 1
+        self.publicar()
+
+    def publicar(self):
+        decorrido = time.monotonic() - self.inicio
+        por_minuto = self.feitos / decorrido * 60 if decorrido > 0 else 0.0
+        dados = {
+            "etapa": self.etapa,
+            "feitos": self.feitos,
+            "total": self.total,
+            "falhas": self.falhas,
+            "por_minuto": round(por_minuto, 2),
+            "decorrido": round(decorrido, 1),
+        }
+        # flush=True: a interface lê a saída por um pipe, que tem buffer
+        print(PREFIXO_PROGRESSO + json.dumps(dados), flush=True)
+
+
+def cancelamento_solicitado():
+    """Retorna True se a interface pediu para o robô parar."""
+    caminho = os.getenv(VARIAVEL_CANCELAMENTO)
+    return bool(caminho) and os.path.exists(caminho)
+
+
+def ler_progresso(linha):
+    """Se a linha for de progresso, retorna o dicionário. Senão, None."""
+    if not linha.startswith(PREFIXO_PROGRESSO):
+        return None
+    try:
+        return json.loads(linha[len(PREFIXO_PROGRESSO):])
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from selenium.webdriver.support.events import EventFiringWebDriver, AbstractEventListener
+
+# --- GRAVAÇÃO E REPETIÇÃO DE SESSÕES DO ROBÔ DE CADASTRO ---
+# Gravação: o robô corre contra o painel real e guarda num ficheiro .jsonl
+# (uma linha JSON por evento) os produtos, os passos e as interações com a
+# página (cliques, digitação, scripts, navegação), cada um com a sua duração.
+# Repetição: os mesmos produtos são cadastrados numa cópia local do painel
+# (pasta 'painel_simulado'), sem rede nem servidor real, e os tempos de cada
+# passo são comparados com os da gravação.
+
+PASTA_PAINEL_SIMULADO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "painel_simulado")
+# -----------------------------------------------------------
+
+
+class GravadorSessao:
+    """Escreve os eventos da sessão num ficheiro .jsonl, à medida que acontecem."""
+
+    def __init__(self, caminho, modo, **cabecalho):
+        self.caminho = caminho
+        self.ficheiro = open(caminho, 'w', encoding='utf-8')
+        self.produto_atual = None
+        self.passo_atual = None
+        self._escrever({"tipo": "sessao", "modo": modo, "inicio": datetime.now().isoformat(timespec="seconds"), **cabecalho})
+
+    def _escrever(self, evento):
+        self.ficheiro.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+    def iniciar_produto(self, produto):
+        self.produto_atual = produto.numero
+        self._escrever({"tipo": "produto", **produto._asdict()})
+
+    def iniciar_passo(self, passo):
+        self.passo_atual = passo
+
+    def terminar_passo(self, duracao):
+        self._escrever({"tipo": "passo", "produto": self.produto_atual, "passo": self.passo_atual, "duracao": round(duracao, 4)})
+        self.passo_atual = None
+
+    def interacao(self, acao, duracao, detalhe=""):
+        self._escrever({
+            "tipo": "interacao", "produto": self.produto_atual, "passo": self.passo_atual,
+            "acao": acao, "detalhe": detalhe, "duracao": round(duracao, 4),
+        })
+
+    def envolver(self, driver):
+        """Envolve o driver para que cada interação com a página seja gravada."""
+        return EventFiringWebDriver(driver, OuvinteInteracoes(self))
+
+    def fechar(self):
+        self.ficheiro.close()
+
+
+class OuvinteInteracoes(AbstractEventListener):
+    """Mede cada interação do Selenium com a página e entrega-a ao gravador."""
+
+    def __init__(self, gravador):
+        self.gravador = gravador
+        self.inicio = None
+
+    def _comecar(self, *args):
+        self.inicio = time.perf_counter()
+
+    def _terminar(self, acao, detalhe=""):
+        if self.inicio is not None:
+            self.gravador.interacao(acao, time.perf_counter() - self.inicio, detalhe)
+            self.inicio = None
+
+    before_click = _comecar
+    before_change_value_of = _comecar
+    before_navigate_to = _comecar
+
+    def before_execute_script(self, script, driver):
+        self._comecar()
+
+    def after_click(self, element, driver):
+        self._terminar("clique")
+
+    def after_change_value_of(self, element, driver):
+        self._terminar("digitacao") # O texto digitado não é gravado (pode ser uma senha)
+
+    def after_navigate_to(self, url, driver):
+        self._terminar("navegacao", url)
+
+    def after_execute_script(self, script, driver):
+        self._terminar("script", " ".join(script.split())[:60])
+
+
+def ler_sessao(caminho):
+    """Lê um ficheiro de sessão. Retorna (cabeçalho, produtos, passos)."""
+    cabecalho, produtos, passos = {}, [], []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            evento = json.loads(linha)
+            tipo = evento.pop("tipo")
+            if tipo == "sessao":
+                cabecalho = evento
+            elif tipo == "produto":
+                produtos.append(evento)
+            elif tipo == "passo":
+                passos.append(evento)
+    return cabecalho, produtos, passos
+
+
+def _medias_por_passo(passos):
+    totais, produtos = {}, set()
+    for passo in passos:
+        totais[passo["passo"]] = totais.get(passo["passo"], 0.0) + passo["duracao"]
+        produtos.add(passo["produto"])
+    return {nome: total / max(len(produtos), 1) for nome, total in totais.items()}
+
+
+def comparar_sessoes(caminho_referencia, caminho_nova):
+    """Imprime o custo médio de cada passo por produto nas duas sessões e a diferença."""
+    _, _, passos_referencia = ler_sessao(caminho_referencia)
+    _, _, passos_nova = ler_sessao(caminho_nova)
+    referencia = _medias_por_passo(passos_referencia)
+    nova = _medias_por_passo(passos_nova)
+
+    print(f"Custo médio por produto: '{os.path.basename(caminho_referencia)}' x '{os.path.basename(caminho_nova)}'")
+    print(f"    {'passo':<12}{'referência':>12}{'nova':>10}{'diferença':>12}")
+    for passo in list(referencia) + [p for p in nova if p not in referencia]:
+        antes, depois = referencia.get(passo), nova.get(passo)
+        texto_antes = f"{antes:.2f}s" if antes is not None else "-"
+        texto_depois = f"{depois:.2f}s" if depois is not None else "-"
+        diferenca = f"{(depois - antes) / antes * 100:+.0f}%" if antes and depois is not None else "-"
+        print(f"    {passo:<12}{texto_antes:>12}{texto_depois:>10}{diferenca:>12}")
+    total_antes, total_depois = sum(referencia.values()), sum(nova.values())
+    print(f"    {'TOTAL':<12}{total_antes:>11.2f}s{total_depois:>9.2f}s"
+          f"{(f'{(total_depois - total_antes) / total_antes * 100:+.0f}%' if total_antes else '-'):>12}")
+
+
+class _ManipuladorPainel(SimpleHTTPRequestHandler):
+    """Serve a pasta do painel simulado e, em '/categorias.js', as categorias da sessão."""
+
+    def __init__(self, *args, categorias=(), **kwargs):
+        self.categorias = categorias
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/categorias.js":
+            corpo = f"window.CATEGORIAS_SIMULADAS = {json.dumps(list(self.categorias), ensure_ascii=False)};".encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/javascript; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass # Sem log de cada pedido no terminal
+
+
+def iniciar_painel_simulado(categorias):
+    """
+    Sobe um servidor local (porta livre) com o painel simulado.
+    Retorna (servidor, url_base). Pare-o com servidor.shutdown().
+    """
+    manipulador = partial(_ManipuladorPainel, directory=PASTA_PAINEL_SIMULADO, categorias=sorted(set(categorias)))
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def main():
+    # Compara duas sessões já gravadas (ex: a repetição antes e depois de uma mudança)
+    if len(sys.argv) != 3:
+        print("Uso: py sessao_gravada.py <sessao_referencia.jsonl> <sessao_nova.jsonl>")
+        sys.exit(1)
+    comparar_sessoes(sys.argv[1], sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()